@@ -0,0 +1,208 @@
+"""
+Speaker-turn and dialogue-act index over classified utterances.
+
+build_index() walks the utterances once and records where each speaker and each
+dialogue function occurs, a function-to-function transition matrix, speaker
+turn-taking counts and adjacency pairs (e.g. a Disagreement answered by a
+Justification). Questions such as "how many commitments did each speaker make"
+or "which proposals were challenged" are then lookups instead of rescans.
+
+Indexes serialise to plain dicts/JSON, and merge() adds the counts of several
+transcripts into a corpus-wide aggregate without reclassifying anything. Offsets
+refer to positions in one transcript, so a merged index keeps the counts only.
+
+Example:
+    index = build_index(classify_utterances(transcript))
+    index.count('Commitment', speaker='Alice')
+    index.pairs('Proposal', 'Challenge')        # offsets of challenged proposals
+    corpus = DialogueIndex.merge_all(DialogueIndex.from_dict(d) for d in saved)
+"""
+import json
+from collections import Counter, defaultdict
+
+from records import FUNCTION_CODES, FUNCTIONS
+
+# (first, second): the second utterance directly answers the first
+ADJACENCY_PAIRS = (
+    ('Disagreement', 'Justification'),
+    ('Deferral', 'Proposal'),
+    ('Proposal', 'Challenge'),
+    ('Proposal', 'Agreement'),
+    ('Proposal', 'Disagreement'),
+    ('Proposal', 'Commitment'),
+    ('Justification', 'Question'),
+    ('Justification', 'Query'),
+    ('Question', 'Inform'),
+    ('Request', 'Commitment'),
+    ('Apology', 'Acknowledgement'),
+    ('Thanking', 'Acknowledgement'),
+)
+_PAIR_CODES = {(FUNCTION_CODES[a], FUNCTION_CODES[b]): f"{a}>{b}" for a, b in ADJACENCY_PAIRS}
+
+
+def _pair_key(first, second):
+    return f"{first}>{second}"
+
+
+class DialogueIndex:
+    def __init__(self):
+        self.transcripts = 0
+        self.utterances = 0
+        self.turns = 0
+        self.function_counts = Counter()
+        self.speaker_function_counts = defaultdict(Counter)   # speaker -> function -> n
+        self.speaker_turns = Counter()                        # speaker -> turns taken
+        self.speaker_transitions = defaultdict(Counter)       # speaker -> next speaker -> n
+        self.transitions = [[0] * len(FUNCTIONS) for _ in FUNCTIONS]
+        self.pair_counts = Counter()                          # "First>Second" -> n
+        # Offsets into the transcript; empty for merged indexes
+        self.speaker_offsets = defaultdict(list)
+        self.function_offsets = defaultdict(list)
+        self.pair_offsets = defaultdict(list)
+        self._pair_sets = None
+
+    # === Queries ===
+    def count(self, function=None, speaker=None):
+        """Number of utterances, optionally restricted to a function and/or speaker."""
+        if speaker is None:
+            return self.utterances if function is None else self.function_counts[function]
+        counts = self.speaker_function_counts.get(speaker, Counter())
+        return sum(counts.values()) if function is None else counts[function]
+
+    def offsets(self, function=None, speaker=None):
+        """Sorted offsets of the utterances with this function and/or speaker."""
+        if function is None and speaker is None:
+            return list(range(self.utterances)) if self.transcripts == 1 else []
+        if speaker is None:
+            return list(self.function_offsets.get(function, ()))
+        if function is None:
+            return list(self.speaker_offsets.get(speaker, ()))
+        by_function = set(self.function_offsets.get(function, ()))
+        return [i for i in self.speaker_offsets.get(speaker, ()) if i in by_function]
+
+    def pairs(self, first, second):
+        """Offsets of each `first` utterance answered directly by a `second` one."""
+        return list(self.pair_offsets.get(_pair_key(first, second), ()))
+
+    def has_pair(self, offset, first, second):
+        if self._pair_sets is None:
+            self._pair_sets = {key: set(offsets) for key, offsets in self.pair_offsets.items()}
+        return offset in self._pair_sets.get(_pair_key(first, second), ())
+
+    def transition_count(self, first, second):
+        return self.transitions[FUNCTION_CODES[first]][FUNCTION_CODES[second]]
+
+    def turn_taking(self):
+        """Per-speaker turns, utterances and share of all turns."""
+        return {
+            speaker: {
+                'turns': turns,
+                'utterances': sum(self.speaker_function_counts[speaker].values()),
+                'turn_share': turns / self.turns if self.turns else 0.0,
+            }
+            for speaker, turns in self.speaker_turns.most_common()
+        }
+
+    # === Merging and serialisation ===
+    def merge(self, other):
+        """Adds other's counts to this index in place (offsets are dropped) and returns it."""
+        self.transcripts += other.transcripts
+        self.utterances += other.utterances
+        self.turns += other.turns
+        self.function_counts.update(other.function_counts)
+        for speaker, counts in other.speaker_function_counts.items():
+            self.speaker_function_counts[speaker].update(counts)
+        self.speaker_turns.update(other.speaker_turns)
+        for speaker, counts in other.speaker_transitions.items():
+            self.speaker_transitions[speaker].update(counts)
+        for row, other_row in zip(self.transitions, other.transitions):
+            for j, value in enumerate(other_row):
+                row[j] += value
+        self.pair_counts.update(other.pair_counts)
+        self.speaker_offsets.clear()
+        self.function_offsets.clear()
+        self.pair_offsets.clear()
+        self._pair_sets = None
+        return self
+
+    @classmethod
+    def merge_all(cls, indexes):
+        merged = cls()
+        for index in indexes:
+            merged.merge(index)
+        return merged
+
+    def to_dict(self, offsets=True):
+        """Plain, JSON-ready dict; offsets=False keeps just the mergeable counts."""
+        data = {
+            'functions': list(FUNCTIONS),
+            'transcripts': self.transcripts,
+            'utterances': self.utterances,
+            'turns': self.turns,
+            'function_counts': dict(self.function_counts),
+            'speaker_function_counts': {s: dict(c) for s, c in self.speaker_function_counts.items()},
+            'speaker_turns': dict(self.speaker_turns),
+            'speaker_transitions': {s: dict(c) for s, c in self.speaker_transitions.items()},
+            'transitions': self.transitions,
+            'pair_counts': dict(self.pair_counts),
+        }
+        if offsets:
+            data.update(speaker_offsets=dict(self.speaker_offsets), function_offsets=dict(self.function_offsets),
+                        pair_offsets=dict(self.pair_offsets))
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if tuple(data['functions']) != FUNCTIONS:
+            raise ValueError("index was built with different dialogue functions")
+        index = cls()
+        index.transcripts = data['transcripts']
+        index.utterances = data['utterances']
+        index.turns = data['turns']
+        index.function_counts.update(data['function_counts'])
+        for speaker, counts in data['speaker_function_counts'].items():
+            index.speaker_function_counts[speaker].update(counts)
+        index.speaker_turns.update(data['speaker_turns'])
+        for speaker, counts in data['speaker_transitions'].items():
+            index.speaker_transitions[speaker].update(counts)
+        index.transitions = [list(row) for row in data['transitions']]
+        index.pair_counts.update(data['pair_counts'])
+        index.speaker_offsets.update(data.get('speaker_offsets', {}))
+        index.function_offsets.update(data.get('function_offsets', {}))
+        index.pair_offsets.update(data.get('pair_offsets', {}))
+        return index
+
+    def to_json(self, offsets=True):
+        return json.dumps(self.to_dict(offsets))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+
+def build_index(utterances):
+    """Builds a DialogueIndex from utterance records (or dicts) in a single pass."""
+    index = DialogueIndex()
+    index.transcripts = 1
+    prev_code = prev_speaker = None
+    for i, u in enumerate(utterances):
+        speaker, function = u['speaker'], u['function']
+        code = FUNCTION_CODES[function]
+        index.speaker_offsets[speaker].append(i)
+        index.function_offsets[function].append(i)
+        index.function_counts[function] += 1
+        index.speaker_function_counts[speaker][function] += 1
+        if speaker != prev_speaker:
+            index.turns += 1
+            index.speaker_turns[speaker] += 1
+            if prev_speaker is not None:
+                index.speaker_transitions[prev_speaker][speaker] += 1
+        if prev_code is not None:
+            index.transitions[prev_code][code] += 1
+            pair = _PAIR_CODES.get((prev_code, code))
+            if pair is not None:
+                index.pair_counts[pair] += 1
+                index.pair_offsets[pair].append(i - 1)
+        prev_code, prev_speaker = code, speaker
+    index.utterances = sum(index.function_counts.values())
+    return index
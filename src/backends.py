@@ -0,0 +1,311 @@
+"""
+Statistical classifier backends for utterances the rules leave as 'Statement'.
+
+The rule engine stays the first pass: only default-'Statement' utterances are sent
+to a backend, in batches, and a backend label is kept only when its probability
+reaches the backend's threshold. The n-gram model calibrates its threshold on a
+hand-labelled held-out set of logged defaults (heldout_labels.jsonl); other
+backends use 0.5, and MODEL_THRESHOLD overrides both. Choose the backend with
+CLASSIFIER_BACKEND:
+
+    rules   no model; every default stays 'Statement' (the default)
+    ngram   HashedNgramModel, a softmax model over hashed word and character
+            n-grams, trained on the utterances the rules matched (numpy only)
+    spacy   a trained spaCy pipeline with a textcat component, loaded from
+            SPACY_MODEL and run through nlp.pipe
+
+The backend is loaded lazily, once per process (so once per batch worker), and
+CLASSIFIER_BATCH_SIZE sets the inference batch size.
+
+Example:
+    CLASSIFIER_BACKEND=ngram python main.py
+    python backends.py train          # re-train and save the n-gram model
+"""
+import abc
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import zlib
+
+from records import FUNCTIONS
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_THRESHOLD = 0.5
+# When set, overrides every backend's own threshold (including the calibrated n-gram one)
+MODEL_THRESHOLD = float(os.environ['MODEL_THRESHOLD']) if os.getenv('MODEL_THRESHOLD') else None
+# Share of the n-gram model's relabels on the held-out set that must be right
+MIN_PRECISION = 0.9
+NGRAM_MODEL_PATH = os.getenv('NGRAM_MODEL_PATH', os.path.join(os.path.dirname(__file__), 'ngram_model.npz'))
+# Utterances with their rule labels, kept current by `python benchmark.py --update-golden`
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'golden_labels.jsonl')
+# Logged default-'Statement' utterances with hand-assigned labels; never used for training
+HELDOUT_PATH = os.path.join(os.path.dirname(__file__), 'heldout_labels.jsonl')
+
+_WORD_RE = re.compile(r"[a-z0-9']+|[?!]")
+
+
+def read_golden(path=GOLDEN_PATH):
+    """Returns the records of a labels file: [{'utterance': ..., 'function': ...}]."""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Backend(abc.ABC):
+    """Interface for statistical classifiers: predict() labels a batch of utterances."""
+    name = 'base'
+    threshold = DEFAULT_THRESHOLD
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    @abc.abstractmethod
+    def predict(self, texts):
+        """Returns one (function, probability) pair per text, in order."""
+
+    def decision_threshold(self):
+        """Probability a predicted label needs to replace 'Statement'."""
+        return self.threshold if MODEL_THRESHOLD is None else MODEL_THRESHOLD
+
+
+# === Hashed n-gram model ===
+def ngram_features(text, n_features):
+    """Stable hashed feature indices: word unigrams and bigrams plus character trigrams of each word."""
+    # Typographic apostrophes are common in pasted transcripts ("I’ll")
+    words = _WORD_RE.findall(text.lower().replace('\u2019', "'").replace('\u2018', "'"))
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    # crc32 rather than hash(), which is salted per process
+    return sorted({zlib.crc32(g.encode('utf-8')) % n_features for g in grams})
+
+
+class HashedNgramModel(Backend):
+    """
+    Multinomial logistic regression over hashed n-gram features. Weights are one
+    (n_features x len(FUNCTIONS)) float32 matrix, so a batch is scored with one
+    gather and one segmented sum.
+    """
+    name = 'ngram'
+
+    def __init__(self, weights=None, bias=None, n_features=2 ** 16, batch_size=DEFAULT_BATCH_SIZE,
+                 threshold=DEFAULT_THRESHOLD):
+        import numpy as np
+        super().__init__(batch_size)
+        self._np = np
+        self.threshold = threshold
+        self.n_features = n_features
+        self.weights = weights if weights is not None else np.zeros((n_features, len(FUNCTIONS)), dtype=np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(FUNCTIONS), dtype=np.float32)
+
+    def _probabilities(self, features):
+        np = self._np
+        lengths = np.fromiter((len(f) for f in features), dtype=np.intp, count=len(features))
+        scores = np.tile(self.bias, (len(features), 1))
+        nonempty = lengths > 0
+        if nonempty.any():
+            flat = np.fromiter((i for f in features for i in f), dtype=np.intp, count=int(lengths.sum()))
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))[nonempty]
+            # Each text's features are contiguous in flat, so one segmented sum scores the batch
+            sums = np.add.reduceat(self.weights[flat], offsets, axis=0)
+            scores[nonempty] += sums / np.sqrt(lengths[nonempty])[:, None]
+        scores -= scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, texts):
+        results = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            probs = self._probabilities([ngram_features(t, self.n_features) for t in batch])
+            best = probs.argmax(axis=1)
+            results.extend((FUNCTIONS[code], float(probs[i, code])) for i, code in enumerate(best))
+        return results
+
+    def fit(self, texts, labels, epochs=20, learning_rate=5.0, l2=1e-5, seed=0):
+        """Trains with mini-batch gradient descent on the cross-entropy loss."""
+        np = self._np
+        features = [ngram_features(t, self.n_features) for t in texts]
+        targets = np.array([FUNCTIONS.index(label) for label in labels])
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            order = rng.permutation(len(features))
+            for start in range(0, len(order), 32):
+                idx = order[start:start + 32]
+                batch = [features[i] for i in idx]
+                grad = self._probabilities(batch)
+                grad[np.arange(len(idx)), targets[idx]] -= 1
+                grad /= len(idx)
+                self.bias -= learning_rate * grad.sum(axis=0)
+                for row, f in zip(grad, batch):
+                    if f:
+                        self.weights[f] -= learning_rate * (row / np.sqrt(len(f)) + l2 * self.weights[f])
+        return self
+
+    def save(self, path):
+        """Writes to a temporary file beside path and renames it, so readers never see a partial model."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self._np.savez_compressed(f, weights=self.weights, bias=self.bias,
+                                          functions=self._np.array(FUNCTIONS), threshold=self.threshold)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, batch_size=DEFAULT_BATCH_SIZE):
+        import numpy as np
+        with np.load(path) as data:
+            if tuple(data['functions']) != FUNCTIONS:
+                raise ValueError(f"{path} was trained for different dialogue functions")
+            if 'threshold' not in data.files:
+                raise ValueError(f"{path} has no calibrated threshold; re-train it")
+            return cls(data['weights'], data['bias'], data['weights'].shape[0], batch_size, float(data['threshold']))
+
+
+def training_corpus():
+    """
+    Texts the rule engine actually matched, with their rule labels: the golden
+    corpus and every rule phrase on its own. Default 'Statement' rows are left
+    out, since they are what the model is meant to relabel.
+    """
+    import classify
+    texts = [record['utterance'] for record in read_golden()]
+    for phrases in (classify.REQUEST_PHRASES, classify.QUESTION_PHRASES, classify.COMMITMENT_PHRASES):
+        texts += phrases
+    for _, phrases in classify.RULES:
+        texts += phrases
+    texts = sorted({t for t in texts if t.strip()})
+    enabled = classify.unclassified_log.enabled
+    classify.unclassified_log.enabled = False
+    try:
+        labelled = [(t, classify.classify_function(t)) for t in texts]
+    finally:
+        classify.unclassified_log.enabled = enabled
+    labelled = [(t, label) for t, label in labelled if label != 'Statement']
+    return [t for t, _ in labelled], [label for _, label in labelled]
+
+
+def evaluation_corpus():
+    """Distinct utterances from the review log: unlabelled defaults to measure relabelling on."""
+    import classify
+    return sorted(set(classify.unclassified_log.read_utterances()))
+
+
+def calibrate_threshold(model, records, min_precision=MIN_PRECISION):
+    """
+    Lowest threshold at which at least min_precision of the model's relabels of
+    records (labelled default-'Statement' utterances) are correct. Returns inf,
+    so nothing is relabelled, when no threshold is that precise.
+    """
+    predictions = model.predict([record['utterance'] for record in records])
+    scored = sorted(((probability, function == record['function'])
+                     for record, (function, probability) in zip(records, predictions) if function != 'Statement'),
+                    key=lambda item: -item[0])
+    threshold, correct = float('inf'), 0
+    for n, (probability, right) in enumerate(scored, 1):
+        correct += right
+        # Ties share a threshold, so only judge the precision after the last of them
+        last_of_tie = n == len(scored) or scored[n][0] < probability
+        if last_of_tie and correct / n >= min_precision:
+            threshold = probability
+    return threshold
+
+
+def train_ngram_model(path=NGRAM_MODEL_PATH, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Trains on training_corpus(), calibrates the threshold on the held-out labels
+    and saves to path (unless None); raises OSError if saving fails.
+    """
+    texts, labels = training_corpus()
+    model = HashedNgramModel(batch_size=batch_size).fit(texts, labels)
+    model.threshold = calibrate_threshold(model, read_golden(HELDOUT_PATH))
+    if path:
+        model.save(path)
+    return model
+
+
+# === spaCy textcat ===
+class SpacyTextcat(Backend):
+    """A spaCy pipeline whose textcat (or textcat_multilabel) labels are dialogue functions."""
+    name = 'spacy'
+
+    def __init__(self, model=None, batch_size=DEFAULT_BATCH_SIZE):
+        import spacy
+        super().__init__(batch_size)
+        model = model or os.getenv('SPACY_MODEL')
+        if not model:
+            raise ValueError("Set SPACY_MODEL to a trained pipeline with a textcat component")
+        # Only the text classifier is needed, so skip the rest of the pipeline
+        self.nlp = spacy.load(model)
+        keep = {'textcat', 'textcat_multilabel', 'tok2vec', 'transformer'}
+        self.nlp.select_pipes(enable=[name for name in self.nlp.pipe_names if name in keep])
+
+    def predict(self, texts):
+        results = []
+        for doc in self.nlp.pipe(texts, batch_size=self.batch_size):
+            function, probability = max(doc.cats.items(), key=lambda item: item[1])
+            results.append((function if function in FUNCTIONS else 'Statement', float(probability)))
+        return results
+
+
+# === Loading ===
+_backend = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_backend(name, batch_size=DEFAULT_BATCH_SIZE):
+    if name == 'ngram':
+        if os.path.exists(NGRAM_MODEL_PATH):
+            try:
+                return HashedNgramModel.load(NGRAM_MODEL_PATH, batch_size)
+            except ValueError:
+                pass  # saved by an older version; train a fresh one below
+        model = train_ngram_model(path=None, batch_size=batch_size)
+        try:
+            model.save(NGRAM_MODEL_PATH)
+        except OSError:
+            pass  # read-only deployments simply train again in the next process
+        return model
+    if name == 'spacy':
+        return SpacyTextcat(batch_size=batch_size)
+    if name in ('rules', 'none', 'off', ''):
+        return None
+    raise ValueError(f"Unknown classifier backend: {name}")
+
+
+def get_backend():
+    """Returns the configured backend, loading it on first use; None for rules only."""
+    global _backend, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                _backend = load_backend(os.getenv('CLASSIFIER_BACKEND', 'rules').lower(),
+                                        int(os.getenv('CLASSIFIER_BATCH_SIZE', DEFAULT_BATCH_SIZE)))
+                _loaded = True
+    return _backend
+
+
+def set_backend(backend):
+    """Installs backend (or None for rules only) for this process, e.g. in tests or benchmarks."""
+    global _backend, _loaded
+    with _lock:
+        _backend, _loaded = backend, True
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['train']:
+        try:
+            model = train_ngram_model()
+        except OSError as e:
+            sys.exit(f"trained the n-gram model but could not save it to {NGRAM_MODEL_PATH}: {e}")
+        print(f"trained {model.name} model (threshold {model.threshold:.2f}), saved to {NGRAM_MODEL_PATH}")
+    else:
+        print(__doc__)
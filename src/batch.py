@@ -0,0 +1,81 @@
+"""
+Batch classification of many transcripts across a process pool.
+
+Example:
+    from batch import classify_batch
+    stats = {}
+    for source, utterances in classify_batch(files, processes=8, stats=stats, paths=True):
+        ...
+    print(stats['utterances_per_second'])
+"""
+import os
+import time
+from multiprocessing import Pool
+
+import metrics
+from classify import classify_stream, classify_utterances, unclassified_log
+
+
+def _classify_item(job):
+    # Runs in the worker process: reading files here keeps the parent from becoming
+    # the I/O bottleneck and avoids pickling whole transcripts for path inputs.
+    source, item, is_path = job
+    if is_path:
+        with open(item, 'rb') as f:
+            # Invalid bytes become U+FFFD, as when summarising, so one badly encoded
+            # file cannot abort a whole batch
+            utterances = list(classify_stream(f, errors='replace'))
+    else:
+        utterances = classify_utterances(item)
+    # Pool workers are terminated without running atexit handlers, so drain the
+    # background log before handing the result back.
+    unclassified_log.flush()
+    return source, utterances
+
+
+def _jobs(items, paths):
+    for index, item in enumerate(items):
+        # A str is only taken for a path when asked, so a mistyped path fails
+        # loudly instead of being classified as a one-line transcript
+        is_path = paths or isinstance(item, os.PathLike)
+        yield (os.fspath(item) if is_path else index), item, is_path
+
+
+def classify_batch(items, processes=None, chunksize=8, ordered=True, stats=None, paths=False):
+    """
+    Classifies an iterable of transcript strings and/or file paths.
+    os.PathLike items are always read as files; str items are transcript text,
+    or file paths with paths=True (a missing file then raises FileNotFoundError).
+    Yields (source, utterances) pairs, where source is the file path or the
+    position of the transcript in items. With ordered=False results are yielded
+    as soon as each chunk finishes. processes defaults to os.cpu_count();
+    processes=1 classifies in the calling process without a pool.
+    If a stats dict is given it is filled with counts and throughput.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if stats is None:
+        stats = {}
+    stats.update(transcripts=0, utterances=0, seconds=0.0, transcripts_per_second=0.0, utterances_per_second=0.0)
+    start = time.perf_counter()
+
+    def record(result):
+        stats['transcripts'] += 1
+        stats['utterances'] += len(result[1])
+        elapsed = time.perf_counter() - start
+        stats['seconds'] = elapsed
+        if elapsed > 0:
+            stats['transcripts_per_second'] = stats['transcripts'] / elapsed
+            stats['utterances_per_second'] = stats['utterances'] / elapsed
+        return result
+
+    if processes == 1:
+        for job in _jobs(items, paths):
+            yield record(_classify_item(job))
+        return
+    with Pool(processes) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for result in imap(_classify_item, _jobs(items, paths), chunksize=chunksize):
+            # Counters incremented in the workers die with them, so count here
+            metrics.inc_each('utterances_total', 'function', (u['function'] for u in result[1]))
+            yield record(result)
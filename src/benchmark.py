@@ -0,0 +1,800 @@
+"""
+Benchmark and regression suite for the dialogue classifier.
+
+Run from the src directory:
+    python benchmark.py                                  # stage timings, golden labels, import budget
+    python benchmark.py --lines 20000 --speakers 6 --json after.json --compare before.json
+    python benchmark.py --update-golden                  # re-record golden_labels.jsonl
+    python benchmark.py --detailed                       # the individual before/after benchmarks
+
+--json records the stage timings with the current commit so runs on different
+commits can be compared with --compare, which fails if any stage is more than
+--regression-threshold (10%) slower. The golden check classifies every
+utterance in golden_labels.jsonl (built from unclassified_utterances.log plus
+synthetic sentences covering every rule table), with classify_function and
+vectorised.classify_series, and fails on any label change.
+The startup check imports classify, summarise and main in fresh interpreters under
+`python -X importtime`; it fails if classify exceeds --import-budget-ms or if any of
+them loads google.generativeai, streamlit, reportlab or pandas at import time.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import classify
+from batch import classify_batch
+from classify import classify_stream, classify_utterances
+from classify import RULES, REQUEST_PHRASES, QUESTION_PHRASES, NEGATIVE_STARTS, COMMITMENT_PHRASES
+
+from backends import GOLDEN_PATH, read_golden
+
+SPEAKERS = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi"]
+
+FILLERS = [
+    "the release", "our sprint", "the QA team", "this feature", "the dashboard", "next week",
+    "the client", "the mobile UI", "budget", "the migration",
+]
+
+
+class FakeModel:
+    """
+    Offline stand-in for genai.GenerativeModel. Sleeps for latency seconds per call
+    and raises on roughly error_rate of calls, so LLM code paths can be exercised
+    without network access or quota.
+    """
+    def __init__(self, latency=0.05, error_rate=0.0, seed=0, model_name='fake-model'):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.model_name = model_name
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self._rng.random() < self.error_rate:
+            raise RuntimeError("simulated upstream error")
+        return _FakeResponse(f"Summary of {prompt.count(chr(10))} prompt lines.")
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def legacy_match_rules(utt):
+    # The original cascade of `phrase in utt` scans, kept as the "before" baseline and
+    # as a reference for checking that the compiled matcher returns identical labels.
+    if utt.endswith('?'):
+        if any(q in utt for q in REQUEST_PHRASES):
+            return 'Request'
+        if any(q in utt for q in QUESTION_PHRASES):
+            return 'Question'
+        return 'Query'
+    if not any(neg in utt for neg in NEGATIVE_STARTS):
+        for phrase in COMMITMENT_PHRASES:
+            if phrase in utt:
+                return 'Commitment'
+    for function, phrases in RULES:
+        if any(phrase in utt for phrase in phrases):
+            return function
+    return None
+
+
+def load_logged_utterances():
+    return classify.unclassified_log.read_utterances()
+
+
+def build_corpus(size, seed=0):
+    """
+    Builds a list of lower-cased utterances mixing logged real utterances with
+    sentences seeded from every rule table, so all categories are exercised.
+    """
+    rng = random.Random(seed)
+    phrases = REQUEST_PHRASES + QUESTION_PHRASES + NEGATIVE_STARTS + COMMITMENT_PHRASES
+    for _, table in RULES:
+        phrases = phrases + table
+    logged = load_logged_utterances()
+    corpus = []
+    for i in range(size):
+        if logged and i % 3 == 0:
+            utt = rng.choice(logged)
+        else:
+            utt = f"{rng.choice(FILLERS)} {rng.choice(phrases)} {rng.choice(FILLERS)}"
+            if rng.random() < 0.2:
+                utt += '?'
+        corpus.append(utt.lower().strip())
+    return corpus
+
+
+def build_transcript(lines, speakers=4, seed=0):
+    """
+    Builds a synthetic 'Speaker: utterance' transcript. Every line contains a rule
+    phrase, so none of them fall through to the default Statement label.
+    """
+    rng = random.Random(seed)
+    phrases = [phrase for _, table in RULES for phrase in table]
+    names = SPEAKERS[:speakers] + [f"Speaker{i}" for i in range(len(SPEAKERS), speakers)]
+    out = []
+    for _ in range(lines):
+        utt = f"{rng.choice(FILLERS).capitalize()} {rng.choice(phrases)} {rng.choice(FILLERS)}."
+        out.append(f"{rng.choice(names)}: {utt}")
+    return '\n'.join(out)
+
+
+def time_matcher(match, corpus, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for utt in corpus:
+            match(utt)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(corpus) / best
+
+
+def bench_classify_function(size=50000):
+    corpus = build_corpus(size)
+    mismatches = [u for u in corpus if classify.match_rules(u) != legacy_match_rules(u)]
+    before = time_matcher(legacy_match_rules, corpus)
+    after = time_matcher(classify.match_rules, corpus)
+    print(f"classify_function rule matching on {size} utterances")
+    print(f"  before (substring scans): {before:,.0f} utterances/s")
+    print(f"  after (compiled matcher): {after:,.0f} utterances/s  ({after / before:.1f}x)")
+    print(f"  label mismatches: {len(mismatches)}")
+    return mismatches
+
+
+def bench_batch(transcripts=400, lines=500, chunksize=8):
+    corpus = [build_transcript(lines, seed=i) for i in range(transcripts)]
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    print(f"classify_batch on {transcripts} transcripts x {lines} lines")
+    baseline = None
+    for processes in counts:
+        stats = {}
+        for _ in classify_batch(corpus, processes=processes, chunksize=chunksize, ordered=False, stats=stats):
+            pass
+        rate = stats['utterances_per_second']
+        baseline = baseline or rate
+        print(f"  {processes:>3} processes: {rate:,.0f} utterances/s  (speed-up {rate / baseline:.2f}x)")
+
+
+def bench_stream(lines=200000):
+    data = build_transcript(lines).encode('utf-8')
+    print(f"classify_stream vs classify_utterances on {lines} lines ({len(data) / 1e6:.1f} MB)")
+
+    stream = io.BytesIO(data)
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = classify_stream(stream)
+    next(records)
+    first = time.perf_counter() - start
+    count = 1 + sum(1 for _ in records)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  stream: first result after {first * 1000:.2f} ms, {count / elapsed:,.0f} utterances/s, peak {peak / 1e6:.2f} MB")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = len(classify_utterances(data.decode('utf-8')))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  whole:  first result after {elapsed * 1000:.2f} ms, {count / elapsed:,.0f} utterances/s, peak {peak / 1e6:.2f} MB")
+
+
+def bench_unclassified_log(misses=20000):
+    # Every utterance here falls through to the default Statement label.
+    corpus = [f"plain remark number {i % 500}" for i in range(misses)]
+    path = os.path.join(tempfile.mkdtemp(), 'unclassified.log')
+    saved_path = classify.unclassified_log.path
+    classify.unclassified_log.path = path
+    try:
+        start = time.perf_counter()
+        for utt in corpus:
+            if classify.match_rules(utt.lower()) is None:
+                with open(path, 'a', encoding='utf-8') as logf:
+                    logf.write(f"[DEFAULT Statement] {utt}\n")
+        before = misses / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for utt in corpus:
+            classify.classify_function(utt)
+        after = misses / (time.perf_counter() - start)
+        classify.unclassified_log.flush()
+    finally:
+        classify.unclassified_log.path = saved_path
+    print(f"default-Statement logging on {misses} misses")
+    print(f"  before (open per miss):  {before:,.0f} utterances/s")
+    print(f"  after (background sink): {after:,.0f} utterances/s  ({after / before:.1f}x)")
+
+
+def bench_pipeline(lines=20000):
+    # Imported here because summarise pulls in the Gemini client.
+    from pipeline import DialoguePipeline
+    from summarise import generate_summary
+
+    transcript = build_transcript(lines)
+    saved_key = os.environ.pop('GOOGLE_API_KEY', None)  # measure classification, not the LLM call
+    try:
+        start = time.perf_counter()
+        classify_utterances(transcript)
+        generate_summary(transcript)
+        before = time.perf_counter() - start
+        start = time.perf_counter()
+        pipeline = DialoguePipeline(transcript)
+        pipeline.utterances
+        pipeline.summary
+        after = time.perf_counter() - start
+    finally:
+        if saved_key is not None:
+            os.environ['GOOGLE_API_KEY'] = saved_key
+    print(f"request processing on {lines} lines (classification + summary, no LLM call)")
+    print(f"  before (classified twice): {before * 1000:,.0f} ms")
+    print(f"  after (DialoguePipeline):  {after * 1000:,.0f} ms  ({before / after:.1f}x)")
+
+
+def bench_summary_cache(lines=200, repeats=20):
+    import summarise
+    from summary_cache import SummaryCache
+
+    transcript = build_transcript(lines)
+    model = FakeModel(latency=0.05)
+    saved_cache = summarise.summary_cache
+    summarise.summary_cache = SummaryCache(os.path.join(tempfile.mkdtemp(), 'cache.sqlite3'))
+    try:
+        utterances = classify_utterances(transcript)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            summarise.generate_summary(transcript, utterances=utterances, model=model)
+        elapsed = time.perf_counter() - start
+        stats = summarise.summary_cache.stats()
+    finally:
+        summarise.summary_cache = saved_cache
+    print(f"generate_summary x{repeats} on one {lines}-line transcript with a {model.latency * 1000:.0f} ms fake model")
+    print(f"  {elapsed / repeats * 1000:.2f} ms/call, {model.calls} upstream calls, {stats['hits']} hits, {stats['misses']} misses")
+
+
+def bench_hierarchical(lines=20000, latency=0.2, error_rate=0.1):
+    import summarise
+
+    utterances = classify_utterances(build_transcript(lines))
+    print(f"summarise_hierarchical on {lines} lines, {latency * 1000:.0f} ms fake model, {error_rate:.0%} errors")
+    for workers in (1, 4, 8):
+        model = FakeModel(latency=latency, error_rate=error_rate)
+        start = time.perf_counter()
+        summarise.summarise_hierarchical(utterances, model, max_workers=workers, backoff=0.05)
+        elapsed = time.perf_counter() - start
+        print(f"  {workers} workers: {elapsed:.2f} s, {model.calls} upstream calls")
+
+
+def bench_summary_client(requests=50, distinct=5, latency=0.2, timeout=1.0):
+    import asyncio
+    import summarise
+    from summary_client import SummaryClient
+
+    transcripts = [build_transcript(40, seed=i) for i in range(distinct)]
+    classified = [classify_utterances(t) for t in transcripts]
+    model = FakeModel(latency=latency)
+    client = SummaryClient(model=model, timeout=timeout, max_concurrency=4)
+    saved_enabled = summarise.summary_cache.enabled
+    summarise.summary_cache.enabled = False  # measure coalescing, not the cache
+
+    async def run():
+        jobs = [client.summarise_async(transcripts[i % distinct], classified[i % distinct]) for i in range(requests)]
+        return await asyncio.gather(*jobs)
+
+    try:
+        start = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - start
+    finally:
+        summarise.summary_cache.enabled = saved_enabled
+    print(f"SummaryClient: {requests} concurrent requests over {distinct} transcripts, {latency * 1000:.0f} ms fake model")
+    print(f"  {elapsed:.2f} s, {model.calls} upstream calls, {client.coalesced} coalesced, {client.timeouts} timeouts")
+
+
+def bench_vectorised(size=1000000):
+    import pandas as pd
+    from vectorised import classify_series
+
+    corpus = build_corpus(size)
+    # build_corpus repeats phrases, and classify_series matches each distinct utterance
+    # once, so a suffixed copy with no repeats gives the speed-up on unique text
+    distinct = [f"{utt[:-1]} item{i}?" if utt.endswith('?') else f"{utt} item{i}" for i, utt in enumerate(corpus)]
+    print(f"vectorised.classify_series on {size:,} utterances")
+    for name, texts in (('distinct', distinct), ('repeated', corpus)):
+        saved_enabled = classify.unclassified_log.enabled
+        classify.unclassified_log.enabled = False
+        try:
+            start = time.perf_counter()
+            expected = [classify.classify_function(utt) for utt in texts]
+            before = time.perf_counter() - start
+        finally:
+            classify.unclassified_log.enabled = saved_enabled
+        series = pd.Series(texts)
+        start = time.perf_counter()
+        labels = classify_series(series)
+        after = time.perf_counter() - start
+        mismatches = int((labels.to_numpy() != pd.Series(expected).to_numpy()).sum())
+        print(f"  {name} ({series.nunique():,} unique):")
+        print(f"    per-row classify_function: {size / before:,.0f} utterances/s")
+        print(f"    vectorised:                {size / after:,.0f} utterances/s  ({before / after:.1f}x)")
+        print(f"    label mismatches: {mismatches}")
+
+
+def legacy_classify_utterances(transcript):
+    # The original per-utterance dict layout, kept as the memory baseline.
+    utterances = []
+    for line in transcript.strip().split('\n'):
+        match = classify._LINE_RE.match(line)
+        if not match:
+            continue
+        speaker, utterance = match.groups()
+        function = classify.classify_function(utterance)
+        utterances.append({
+            'speaker': speaker.strip(),
+            'utterance': utterance.strip(),
+            'function': function,
+            'confidence': 1.0,
+            'rationale': f"Classified as {function} based on keywords/rules."
+        })
+    return utterances
+
+
+def bench_records(lines=1000000):
+    transcript = build_transcript(lines)
+    print(f"memory held by classified utterances on a {lines:,}-line transcript")
+    for name, parse in (('dicts', legacy_classify_utterances), ('Utterance records', classify_utterances)):
+        tracemalloc.start()
+        utterances = parse(transcript)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {name:<18} {current / 1e6:,.1f} MB  ({current / len(utterances):.0f} bytes/utterance)")
+        del utterances
+
+
+def bench_incremental(lines=5000, repeats=20):
+    from incremental import IncrementalClassifier
+
+    transcript = build_transcript(lines)
+    edited = transcript.split('\n')
+    edited[lines // 2] = "Alice: I'll update you once the release is tested."
+    edited.append("Bob: Thanks, that makes sense.")
+    edited = '\n'.join(edited)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        classify_utterances(edited)
+    full = (time.perf_counter() - start) / repeats
+    classifier = IncrementalClassifier()
+    classifier.classify(transcript)
+    start = time.perf_counter()
+    for i in range(repeats):
+        classifier.classify(edited if i % 2 == 0 else transcript)
+    incremental = (time.perf_counter() - start) / repeats
+    assert classifier.classify(edited) == classify_utterances(edited)
+    print(f"resubmitting a {lines}-line transcript with one edited and one appended line")
+    print(f"  full classification: {full * 1000:.2f} ms")
+    print(f"  incremental:         {incremental * 1000:.2f} ms  ({full / incremental:.1f}x)")
+
+
+def bench_backend(lines=20000):
+    import backends
+
+    # Half synthetic rule hits, half utterances the rules left as 'Statement' in the review log
+    logged = load_logged_utterances()
+    transcript = '\n'.join(
+        [build_transcript(lines // 2)] +
+        [f"{SPEAKERS[i % len(SPEAKERS)]}: {logged[i % len(logged)]}" for i in range(lines - lines // 2)])
+    with review_log_disabled():
+        backends.set_backend(None)
+        start = time.perf_counter()
+        baseline = classify_utterances(transcript)
+        rules = time.perf_counter() - start
+        start = time.perf_counter()
+        model = backends.train_ngram_model(path=None)
+        trained = time.perf_counter() - start
+        statements = sum(1 for u in baseline if u['function'] == 'Statement')
+        print(f"{lines:,} lines, {statements:,} default-Statement utterances sent to the n-gram model "
+              f"(trained in {trained:.2f} s)")
+        print(f"  rules only:            {rules * 1000:8.1f} ms")
+        try:
+            for batch_size in (1, 32, 256, 2048):
+                model.batch_size = batch_size
+                backends.set_backend(model)
+                start = time.perf_counter()
+                utterances = classify_utterances(transcript)
+                elapsed = time.perf_counter() - start
+                relabelled = [u for u in utterances if u['confidence'] < 1.0 and u['function'] != 'Statement']
+                print(f"  batch_size={batch_size:<5}       {elapsed * 1000:8.1f} ms  "
+                      f"{len(relabelled):,} relabelled")
+        finally:
+            backends.set_backend(None)
+    # The review log is held out of training, so it measures how often real defaults get relabelled
+    threshold = model.decision_threshold()
+    held_out = backends.evaluation_corpus()
+    relabelled = sum(1 for function, p in model.predict(held_out) if function != 'Statement' and p >= threshold)
+    print(f"  held-out review log:   {relabelled}/{len(held_out)} distinct defaults relabelled "
+          f"({relabelled / max(len(held_out), 1):.0%}) at threshold {threshold:.2f}")
+    # ...and the hand-labelled copy of it, which the threshold was calibrated on, how often they are right
+    labelled = backends.read_golden(backends.HELDOUT_PATH)
+    checks = [(p, function, record) for record, (function, p) in zip(labelled, model.predict([r['utterance'] for r in labelled]))
+              if function != 'Statement' and p >= threshold]
+    right = sum(1 for _, function, record in checks if function == record['function'])
+    print(f"  held-out labels:       {right}/{len(checks)} relabels correct "
+          f"(target {backends.MIN_PRECISION:.0%})")
+    for probability, function, record in sorted(checks, key=lambda item: -item[0])[:10]:
+        mark = 'ok' if function == record['function'] else f"want {record['function']}"
+        print(f"    {probability:.2f} {function:<15} {record['utterance'][:60]:<60} {mark}")
+
+
+def bench_diagram(lines=100000):
+    import diagram
+
+    utterances = classify_utterances(build_transcript(lines, speakers=6))
+    print(f"Mermaid generation on {lines:,} utterances")
+    for mode in ('flow', 'runs', 'transitions', 'auto'):
+        for max_nodes in (None, diagram.DEFAULT_MAX_NODES):
+            if mode == 'auto' and max_nodes is None:
+                continue
+            start = time.perf_counter()
+            text = diagram.generate_mermaid_diagram(utterances, mode=mode, max_nodes=max_nodes)
+            elapsed = time.perf_counter() - start
+            nodes = sum(1 for line in text.split('\n') if '["' in line)
+            print(f"  {mode:<11} max_nodes={str(max_nodes):<5} {elapsed * 1000:8.1f} ms  {nodes:>7,} nodes  {len(text) / 1e6:.2f} MB")
+
+
+def bench_pdf(pages=1000):
+    from pdf_export import pdf_bytes, write_pdf
+
+    # About 50 table rows fit on an A4 page
+    utterances = classify_utterances(build_transcript(pages * 50))
+    summary = "\n\n".join(f"Paragraph {i}: " + "The team discussed the release plan in detail. " * 12 for i in range(20))
+    path = os.path.join(tempfile.mkdtemp(), 'report.pdf')
+    start = time.perf_counter()
+    written = write_pdf(path, summary, utterances)
+    elapsed = time.perf_counter() - start
+    print(f"PDF export of a summary and {len(utterances):,} utterances")
+    print(f"  write_pdf: {written} pages in {elapsed:.2f} s, {os.path.getsize(path) / 1e6:.1f} MB")
+    start = time.perf_counter()
+    pdf_bytes(summary, utterances)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    pdf_bytes(summary, utterances)
+    again = time.perf_counter() - start
+    print(f"  pdf_bytes: {first:.2f} s first call, {again * 1000:.1f} ms memoised")
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def bench_api(classify_requests=400, summarise_requests=40, concurrency=16, latency=0.5):
+    """
+    Load test for the Flask JSON API: runs the app on a local threaded server with a
+    FakeModel behind the summary client, fires classify requests alongside summarise
+    jobs, and reports p50/p99 latency and requests per second.
+    """
+    import json
+    import logging
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import make_server
+    import main
+    import summary_client
+
+    saved_client = summary_client._client
+    summary_client._client = summary_client.SummaryClient(model=FakeModel(latency=latency), max_concurrency=8)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    base = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def post(path, payload):
+        req = urllib.request.Request(base + path, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())
+
+    def classify_once(i):
+        start = time.perf_counter()
+        post('/api/classify', {'transcript': build_transcript(200, seed=i)})
+        return 'classify', time.perf_counter() - start
+
+    def summarise_once(i):
+        start = time.perf_counter()
+        job = post('/api/summarise', {'transcript': build_transcript(40, seed=100000 + i)})
+        while True:
+            with urllib.request.urlopen(base + job['status_url']) as resp:
+                if json.loads(resp.read())['status'] in ('done', 'failed'):
+                    break
+            time.sleep(0.02)
+        return 'summarise', time.perf_counter() - start
+
+    try:
+        jobs = [(summarise_once, i) for i in range(summarise_requests)] + [(classify_once, i) for i in range(classify_requests)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(lambda job: job[0](job[1]), jobs))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        summary_client._client = saved_client
+    print(f"JSON API load test: {classify_requests} classify + {summarise_requests} summarise requests, "
+          f"{concurrency} clients, {latency * 1000:.0f} ms fake model")
+    for kind in ('classify', 'summarise'):
+        times = [t for k, t in results if k == kind]
+        print(f"  {kind:<10} p50 {_percentile(times, 50) * 1000:7.1f} ms   p99 {_percentile(times, 99) * 1000:7.1f} ms")
+    print(f"  overall    {len(results) / elapsed:,.1f} requests/s")
+
+
+@contextlib.contextmanager
+def review_log_disabled():
+    saved = classify.unclassified_log.enabled
+    classify.unclassified_log.enabled = False
+    try:
+        yield
+    finally:
+        classify.unclassified_log.enabled = saved
+
+
+# === Golden corpus ===
+def build_golden_corpus(synthetic=600, seed=0):
+    """
+    Every utterance from the review log plus synthetic sentences seeded from all rule
+    tables (mixed case, with and without '?'), labelled by the current classifier.
+    """
+    rng = random.Random(seed)
+    phrases = REQUEST_PHRASES + QUESTION_PHRASES + NEGATIVE_STARTS + COMMITMENT_PHRASES
+    for _, table in RULES:
+        phrases = phrases + table
+    utterances = load_logged_utterances()
+    for _ in range(synthetic):
+        utt = f"{rng.choice(FILLERS).capitalize()} {rng.choice(phrases)} {rng.choice(FILLERS)}"
+        utterances.append(utt + rng.choice(['.', '?', '', '!']))
+    with review_log_disabled():
+        return [{'utterance': utt, 'function': classify.classify_function(utt)}
+                for utt in dict.fromkeys(utterances)]
+
+
+def write_golden(path=GOLDEN_PATH):
+    corpus = build_golden_corpus()
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in corpus:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    print(f"wrote {len(corpus)} golden labels to {path}")
+
+
+def check_golden(path=GOLDEN_PATH):
+    """
+    Returns the golden records whose label differs from classify_function today,
+    then those whose label differs from vectorised.classify_series.
+    """
+    corpus = read_golden(path)
+    with review_log_disabled():
+        labels = [classify.classify_function(record['utterance']) for record in corpus]
+    mismatches = [dict(record, now=label) for record, label in zip(corpus, labels) if label != record['function']]
+    print(f"golden labels: {len(corpus) - len(mismatches)}/{len(corpus)} unchanged")
+    for record in mismatches[:20]:
+        print(f"  {record['function']} -> {record['now']}: {record['utterance']}")
+    return mismatches + check_vectorised_golden(corpus)
+
+
+def check_vectorised_golden(corpus):
+    """Returns the golden records whose label differs from vectorised.classify_series (needs pandas)."""
+    try:
+        from vectorised import classify_series
+    except ImportError:
+        print("vectorised golden labels: skipped (pandas is not installed)")
+        return []
+    labels = classify_series([record['utterance'] for record in corpus]).tolist()
+    mismatches = [dict(record, now=label) for record, label in zip(corpus, labels) if label != record['function']]
+    print(f"vectorised golden labels: {len(corpus) - len(mismatches)}/{len(corpus)} match")
+    for record in mismatches[:20]:
+        print(f"  {record['function']} -> {record['now']} (vectorised): {record['utterance']}")
+    return mismatches
+
+
+# === Startup ===
+# Cumulative import budget for the classifier, measured in a fresh interpreter.
+IMPORT_BUDGET_MS = 100.0
+# Heavy packages that must only load on the code paths that use them
+LAZY_MODULES = ('google.generativeai', 'streamlit', 'reportlab', 'pandas')
+STARTUP_MODULES = ('classify', 'summarise', 'main')
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def import_time(module, repeat=5):
+    """
+    Imports module in fresh interpreters under `python -X importtime` and returns
+    (best cumulative import time in ms, names of every module it imported).
+    The first run also warms the bytecode cache, hence the best of several runs.
+    """
+    best = None
+    imported = set()
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            match = _IMPORTTIME_RE.match(line)
+            if not match:
+                continue
+            imported.add(match.group(4))
+            if match.group(4) == module and not match.group(3):
+                cumulative = int(match.group(2)) / 1000
+                best = cumulative if best is None else min(best, cumulative)
+    return best, imported
+
+
+def check_startup(budget_ms=IMPORT_BUDGET_MS):
+    """
+    Times the cold import of each STARTUP_MODULES entry and returns a list of
+    failures: classify over budget_ms, or any module pulling in a LAZY_MODULES package.
+    """
+    failures = []
+    print("startup imports:")
+    for module in STARTUP_MODULES:
+        try:
+            ms, imported = import_time(module)
+        except subprocess.CalledProcessError as e:
+            # e.g. flask not installed; not a startup regression
+            print(f"  {module:<20} skipped ({e.stderr.strip().splitlines()[-1]})")
+            continue
+        eager = sorted(name for name in LAZY_MODULES if name in imported)
+        print(f"  {module:<20} {ms:9.1f} ms" + (f"  imports {', '.join(eager)}" if eager else ""))
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} at startup")
+        if module == 'classify' and ms > budget_ms:
+            failures.append(f"classify import took {ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"  FAIL {failure}")
+    return failures
+
+
+# === Stage timings ===
+def _best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_suite(lines=10000, speakers=4, repeat=3):
+    """Times classification, the rule-based summary, Mermaid and PDF generation."""
+    from diagram import generate_mermaid_diagram
+    from pdf_export import write_pdf
+    from summarise import generate_summary
+
+    transcript = build_transcript(lines, speakers=speakers)
+    with review_log_disabled():
+        utterances = classify_utterances(transcript)
+        # The rule-based path summarises dialogues of up to 8 utterances
+        chunks = [utterances[i:i + 8] for i in range(0, len(utterances), 8)]
+        summary = ' '.join(generate_summary('', utterances=chunk) for chunk in chunks[:50])
+        stages = {
+            'classify_utterances': (lambda: classify_utterances(transcript), len(utterances)),
+            'rule_based_summary': (lambda: [generate_summary('', utterances=chunk) for chunk in chunks], len(utterances)),
+            'mermaid_auto': (lambda: generate_mermaid_diagram(utterances), len(utterances)),
+            'mermaid_flow': (lambda: generate_mermaid_diagram(utterances, mode='flow', max_nodes=None), len(utterances)),
+            'pdf': (lambda: write_pdf(io.BytesIO(), summary, utterances), len(utterances)),
+        }
+        results = {}
+        for name, (fn, count) in stages.items():
+            seconds = _best_of(fn, repeat)
+            results[name] = {'seconds': seconds, 'utterances_per_second': count / seconds}
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_results(before, after, threshold=0.10):
+    """Prints per-stage speed ratios; returns the stages slower by more than threshold."""
+    regressions = []
+    print(f"compared with {before.get('commit') or 'baseline'} (throughput ratio, >1 is faster):")
+    if before.get('params') != after.get('params'):
+        print(f"  note: parameters differ ({before.get('params')} vs {after.get('params')})")
+    for name, result in after['results'].items():
+        old = before.get('results', {}).get(name)
+        if not old:
+            continue
+        ratio = result['utterances_per_second'] / old['utterances_per_second']
+        flag = ''
+        if ratio < 1 - threshold:
+            regressions.append(name)
+            flag = '  <-- slower'
+        print(f"  {name:<20} {ratio:5.2f}x{flag}")
+    return regressions
+
+
+def run_detailed():
+    bench_classify_function()
+    bench_batch()
+    bench_stream()
+    bench_unclassified_log()
+    bench_pipeline()
+    bench_summary_cache()
+    bench_hierarchical()
+    bench_summary_client()
+    bench_vectorised()
+    bench_records()
+    bench_incremental()
+    bench_backend()
+    bench_diagram()
+    bench_pdf()
+    bench_api()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lines', type=int, default=10000, help="utterances in the synthetic transcript")
+    parser.add_argument('--speakers', type=int, default=4, help="distinct speakers in the synthetic transcript")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per stage (best is kept)")
+    parser.add_argument('--json', help="write results to this JSON file")
+    parser.add_argument('--compare', help="compare with results from an earlier --json run; fail on regressions")
+    parser.add_argument('--regression-threshold', type=float, default=0.10,
+                        help="with --compare, fail if a stage is slower by more than this fraction")
+    parser.add_argument('--update-golden', action='store_true', help="re-record the golden labels and exit")
+    parser.add_argument('--detailed', action='store_true', help="run the individual before/after benchmarks")
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help="fail if importing classify takes longer than this")
+    args = parser.parse_args(argv)
+
+    if args.update_golden:
+        write_golden()
+        return 0
+    if args.detailed:
+        run_detailed()
+        return 0
+
+    mismatches = check_golden()
+    startup_failures = check_startup(args.import_budget_ms)
+    results = run_suite(args.lines, args.speakers, args.repeat)
+    print(f"stage timings on {args.lines} lines, {args.speakers} speakers (best of {args.repeat}):")
+    for name, result in results.items():
+        print(f"  {name:<20} {result['seconds'] * 1000:9.1f} ms  {result['utterances_per_second']:>12,.0f} utterances/s")
+    record = {
+        'commit': _commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'params': {'lines': args.lines, 'speakers': args.speakers, 'repeat': args.repeat},
+        'golden_mismatches': len(mismatches),
+        'startup_failures': startup_failures,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2)
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare_results(json.load(f), record, args.regression_threshold)
+    return 1 if mismatches or startup_failures or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,39 +1,302 @@
+import codecs
 import re
 import os
 
+import metrics
+from backends import get_backend
+from records import FUNCTION_CODES, Utterance
+from settings import env_flag
+from unclassified_log import UnclassifiedLog
 
-nlp = None
-textcat = None
+# === Rule tables ===
+# Phrases are matched as substrings of the lower-cased utterance. Each table is compiled
+# once at import (see _compile_phrases); the rule order in classify_function is unchanged.
 
+# Questions, queries and Requests (only checked for utterances ending with '?')
+REQUEST_PHRASES = ['can you', 'could you', 'would you', 'will you', 'shall we', 'please', 'would it be possible']
+QUESTION_PHRASES = ['why', 'what', 'how', 'when', 'where', 'who', 'is it', 'are you', 'do you', 'does it', 'can it', 'could it', 'would it', 'will it', 'shall we', 'may I', 'might I']
+
+# Commitment (Ensure this check comes before Disagreement and Agreement)
+NEGATIVE_STARTS = [
+    "i'm not", "i am not", "i will not", "i won't", "i can't", "i shouldn't", "i couldn't", "i wouldn't", "i might", "i may", "i hope", "i plan", "i want", "i wish", "i would like", "i intend", "i expect", "i think", "i don't", "i guess", "i suppose", "i doubt", "i wonder"
+]
+COMMITMENT_PHRASES = [
+    "i'm", "i am", "i will", "i'll", "i shall", "we will", "we'll", "we shall", "i can",
+    "i'll handle", "i'll take", "i'll do", "i'll get", "i'll make", "i'll see", "i'll ensure",
+    "i'll address", "i'll manage", "i'll finish", "i'll update", "i'll confirm", "i'll follow",
+    "i'll complete", "i'll work", "i'll start", "i'll lead", "i'll get started", "i'll get that",
+    "i'll make sure", "i'll take care", "i'll see to it", "i'll follow through", "i'll address it soon",
+    "i'll get started now", "i'll finish it soon", "i'll take the lead", "i'll update you",
+    "i'll confirm when finished", "i'll prepare", "i'll prepare a status update", "fair enough", "i'll help",
+    "we can", "we'll handle", "we'll take", "we'll do", "we'll get", "we'll make", "we'll see", "we'll ensure",
+    "we'll address", "we'll manage", "we'll finish", "we'll update", "we'll confirm", "we'll follow",
+    "we'll complete", "we'll work", "we'll start", "we'll lead", "we'll get started", "we'll get that",
+    "we'll make sure", "we'll take care", "we'll see to it", "we'll follow through", "we'll address it soon",
+    "we'll get started now", "we'll finish it soon", "we'll take the lead", "we'll update you",
+    "we'll confirm when finished", "we'll prepare", "we'll prepare a status update", "we'll help"
+]
+
+PROPOSAL_PHRASES = [
+    "how about", "let's", "maybe we could", "i propose", "shall we", "i suggest", "why don't we", "perhaps we should",
+    "i recommend", "let us", "i'd like to propose", "i'd suggest", "i'd recommend", "i think we should", "maybe we hold off",
+    "maybe we should", "then maybe we", "i think we could", "i think we can", "i think we might", "i think we may",
+    "i think we shall", "i think we will", "i think we ought to", "i think we need to", "i think we have to", "i think we must"
+]
+DEFERRAL_PHRASES = [
+    "not yet", "on the roadmap", "let's come back", "we can discuss this next time", "let's postpone", "we'll revisit",
+    "let's defer", "we'll talk about this later", "let's address this in the future", "we'll handle this next time",
+    "let's leave this for now", "we'll return to this", "let's put this on hold", "we'll get back to this", "let's delay this",
+    "we'll pick this up later", "let's save this for later", "we'll continue this later", "let's revisit this", "we'll postpone this",
+    "let's discuss this later", "we'll come back to this"
+]
+CHALLENGE_PHRASES = [
+    "are you sure", "can you prove", "is that really", "can you back that up", "are you certain", "can you show proof",
+    "is that correct", "can you demonstrate", "are you positive", "can you verify", "is that true", "can you confirm",
+    "can you justify", "is there evidence", "can you support", "is that verifiable", "can you show evidence", "is that provable",
+    "i'd like to see evidence", "is that accurate", "is that right", "is that the case", "is that so", "is that confirmed",
+    "is that valid", "is that supported"
+]
+JUSTIFICATION_PHRASES = [
+    "because", "the reason", "due to", "as a result", "since", "that's why", "the cause", "the explanation", "the rationale",
+    "the logic", "the basis", "the underlying reason", "the consequence", "the result", "the explanation is", "the reason is",
+    "it's because", "it's due to", "it's a result of", "it's a consequence of", "it's the result of", "it's the cause of",
+    "it's the reason for", "true, but", "the latest version uses"
+]
+THANKING_PHRASES = [
+    "thank", "thanks", "appreciate", "grateful", "gratitude", "much obliged", "owe you", "sincere thanks", "greatly appreciated",
+    "immense thanks", "heartfelt thanks", "endless gratitude", "really appreciate", "thanks a ton", "thanks a million",
+    "thank you for your time", "thanks again", "i owe you one"
+]
+APOLOGY_PHRASES = [
+    "sorry", "apolog", "pardon", "my apologies", "i apologize", "forgive me", "i didn't mean", "regret", "my fault", "my mistake",
+    "inconvenience", "trouble", "oversight", "delay", "mix-up", "take responsibility"
+]
+GREETING_PHRASES = [
+    "hi", "hello", "good morning", "good afternoon", "good evening", "hey", "greetings", "welcome", "salutations", "nice to see you",
+    "pleased to meet you", "how are you", "how's it going", "yo", "what's up", "hi all", "hi team", "hi everyone", "hi folks", "hi buddy",
+    "hi friend", "hi pal", "hi fam", "hi again", "hello mate", "hello again", "hello folks", "hello team", "hello everyone", "hello all",
+    "hello friend", "hello pal", "hello fam", "good to see you", "good day", "good night"
+]
+CLOSING_PHRASES = [
+    "goodbye", "bye", "see you", "take care", "farewell", "catch you later", "see you soon", "see you around", "until next time",
+    "later", "goodbye for now", "see you later", "all the best", "bye for now", "take it easy", "see you tomorrow", "goodbye everyone",
+    "have a good one", "see you then"
+]
+AGREEMENT_PHRASES = [
+    "i agree", "that makes sense", "absolutely", "i think you're right", "i support that", "i'm with you", "i concur", "that's true",
+    "i believe so", "i'm in agreement", "i share your view", "i agree completely", "that's correct", "i agree 100%", "i'm on board",
+    "i agree wholeheartedly", "that's my view too", "i see it the same way", "i agree entirely", "i'm in full agreement", "sure",
+    "of course", "definitely", "yes"
+]
+DISAGREEMENT_PHRASES = [
+    "i'm not convinced", "i don't think", "i see it differently", "i'm not sure i agree", "i have a different opinion", "i disagree",
+    "that's not how i see it", "i can't agree", "i don't share that view", "i beg to differ", "that's not my understanding",
+    "i see things another way", "i don't believe that's right", "i have to disagree", "i respectfully disagree", "that's not accurate",
+    "i don't think that's the case", "i don't see it that way", "i must disagree", "i can't support that", "no", "not really", "unfortunately"
+]
+ACKNOWLEDGEMENT_PHRASES = [
+    "okay", "ok", "alright", "got it", "understood", "noted", "i see", "thanks for letting me know", "i understand", "alright, thanks",
+    "okay, got it", "i acknowledge", "alright, noted", "okay, understood", "i got it", "alright, i see", "okay, i understand", "alright, got it",
+    "okay, thanks for the info", "i see, thanks"
+]
+INFORM_PHRASES = [
+    "i think", "i believe", "let me", "the reason", "because", "just to let you know", "for your information", "fyi", "just so you know",
+    "this is to inform you", "just a heads up", "please be aware", "i thought you should know", "for your awareness", "just making you aware",
+    "i wanted to inform you", "just to keep you posted", "for your reference", "just to update you", "i wanted to update you", "just to notify you",
+    "for your records", "just to keep you informed"
+]
+
+# Priority order of the phrase rules that follow the question and commitment checks.
+RULES = [
+    ('Proposal', PROPOSAL_PHRASES),
+    ('Deferral', DEFERRAL_PHRASES),
+    ('Challenge', CHALLENGE_PHRASES),
+    ('Justification', JUSTIFICATION_PHRASES),
+    ('Thanking', THANKING_PHRASES),
+    ('Apology', APOLOGY_PHRASES),
+    ('Greeting', GREETING_PHRASES),
+    ('Closing', CLOSING_PHRASES),
+    ('Agreement', AGREEMENT_PHRASES),
+    ('Disagreement', DISAGREEMENT_PHRASES),
+    ('Acknowledgement', ACKNOWLEDGEMENT_PHRASES),
+    ('Inform', INFORM_PHRASES),
+]
+
+def _trie_pattern(node):
+    # A key of None marks the end of a phrase. Any longer phrase below it is redundant for
+    # substring matching, so callers never descend past a terminal node.
+    branches = []
+    for char in sorted(k for k in node if k is not None):
+        child = node[char]
+        if None in child:
+            branches.append(re.escape(char))
+        else:
+            branches.append(re.escape(char) + _trie_pattern(child))
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+def _compile_phrases(phrases):
+    """
+    Compiles a phrase list into one regex whose search() is true exactly when
+    any(phrase in utt for phrase in phrases) is. Phrases are folded into a prefix
+    trie so each position in the utterance is scanned once per category.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            if None in node:
+                break
+            node = node.setdefault(char, {})
+        else:
+            node.clear()
+            node[None] = True
+    return re.compile(_trie_pattern(trie))
+
+_REQUEST_RE = _compile_phrases(REQUEST_PHRASES)
+_QUESTION_RE = _compile_phrases(QUESTION_PHRASES)
+_NEGATIVE_RE = _compile_phrases(NEGATIVE_STARTS)
+_COMMITMENT_RE = _compile_phrases(COMMITMENT_PHRASES)
+_COMPILED_RULES = [(function, _compile_phrases(phrases)) for function, phrases in RULES]
+
+# Default-'Statement' utterances are flagged for review through a background writer.
+# Set UNCLASSIFIED_LOG=off (or unclassified_log.enabled = False) to switch it off.
+unclassified_log = UnclassifiedLog(
+    os.path.join(os.path.dirname(__file__), 'unclassified_utterances.log'),
+    enabled=env_flag('UNCLASSIFIED_LOG'),
+)
+
+_LINE_RE = re.compile(r'^(.*?):\s+(.*)$')
+
+@metrics.timed('classify')
 def classify_utterances(transcript):
     """
     Parses the transcript and classifies each utterance by dialogue function.
-    Uses simple rule-based heuristics (can be replaced with a model).
-    Returns a list of dicts: [{speaker, utterance, function}]
-    """
-    utterances = []
-    for line in transcript.strip().split('\n'):
-        match = re.match(r'^(.*?):\s+(.*)$', line)
-        if not match:
-            continue
-        speaker, utterance = match.groups()
-        function = classify_function(utterance)
-        # Example: Add confidence/rationale (rule-based: always 1.0, or a short explanation)
-        confidence = 1.0
-        rationale = f"Classified as {function} based on keywords/rules."
-        utterances.append({
-            'speaker': speaker.strip(),
-            'utterance': utterance.strip(),
-            'function': function,
-            'confidence': confidence,
-            'rationale': rationale
-        })
+    Uses rule-based heuristics, then the statistical backend (if configured) for
+    the utterances the rules leave as 'Statement'.
+    Returns a list of Utterance records, which read like dicts:
+    [{speaker, utterance, function, confidence, rationale}]
+    """
+    utterances = [record for record in classify_lines(transcript.strip().split('\n')) if record is not None]
+    apply_backend(utterances)
+    # Counted per transcript rather than per utterance to keep the hot path cheap
+    metrics.inc_each('utterances_total', 'function', (u.function for u in utterances))
     return utterances
 
+def classify_line(line):
+    """
+    Parses and classifies a single 'Speaker: utterance' line, the same way as
+    classify_lines (timed, and relabelled by the backend if one is configured).
+    Returns an Utterance record, or None if the line is not an utterance.
+    """
+    record = classify_lines([line])[0]
+    if record is not None:
+        apply_backend([record])
+    return record
+
+def classify_lines(lines):
+    """
+    Rule-classifies a batch of lines, returning one Utterance record per line (None
+    for lines that are not utterances). Parsing and the rule cascade are timed as
+    the 'parse' and 'rules' stages, once per batch.
+    """
+    with metrics.timer('parse'):
+        parsed = [match and match.groups() for match in map(_LINE_RE.match, lines)]
+    with metrics.timer('rules'):
+        return [None if groups is None else Utterance(groups[0].strip(), groups[1].strip(), classify_function(groups[1]), 1.0)
+                for groups in parsed]
+
+def classify_stream(stream, encoding='utf-8', chunk_size=64 * 1024, errors='strict'):
+    """
+    Incrementally classifies a transcript read from a text or binary file object.
+    Bytes are decoded chunk by chunk (errors as for bytes.decode, e.g. 'replace'
+    to keep going past invalid bytes), and the records of each chunk's complete lines
+    are yielded as soon as it is classified (one backend batch per chunk), so memory
+    stays bounded by the chunk size and the longest line.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        # Timed per chunk, so time spent by the consumer between chunks is not counted
+        with metrics.timer('classify_stream'):
+            records = [record for record in classify_lines(lines) if record is not None]
+            apply_backend(records)
+        metrics.inc_each('utterances_total', 'function', (u.function for u in records))
+        yield from records
+    pending += decoder.decode(b'', final=True)
+    with metrics.timer('classify_stream'):
+        records = [record for record in classify_lines([pending]) if record is not None]
+        apply_backend(records)
+    metrics.inc_each('utterances_total', 'function', (u.function for u in records))
+    yield from records
+
 def classify_function_with_confidence(utterance):
-    # Only rule-based logic, no spaCy model
+    """
+    Returns (function, confidence). Rule matches have confidence 1.0; a default
+    'Statement' goes to the statistical backend, if one is configured.
+    """
     function = classify_function(utterance)
-    return function, None
+    backend = get_backend()
+    if function != 'Statement' or backend is None or not utterance.strip():
+        return function, 1.0
+    return _decide(*backend.predict([utterance.strip()])[0], backend.decision_threshold())
+
+def _decide(function, probability, threshold):
+    if function != 'Statement' and probability >= threshold:
+        return function, probability
+    # The model's best alternative was not convincing enough, so keep the default;
+    # 1 - p is how much probability the model leaves for 'Statement' at most
+    return 'Statement', probability if function == 'Statement' else 1.0 - probability
+
+_STATEMENT = FUNCTION_CODES['Statement']
+
+def apply_backend(records):
+    """
+    Sends the default-'Statement' records to the statistical backend in one batch
+    and relabels them in place with the model's function and confidence.
+    Does nothing when no backend is configured (CLASSIFIER_BACKEND=rules).
+    """
+    backend = get_backend()
+    if backend is None:
+        return records
+    pending = [r for r in records if r.code == _STATEMENT and r.confidence == 1.0 and r.utterance]
+    if pending:
+        with metrics.timer('model'):
+            predictions = backend.predict([r.utterance for r in pending])
+        threshold = backend.decision_threshold()
+        for record, prediction in zip(pending, predictions):
+            function, record.confidence = _decide(*prediction, threshold)
+            record.code = FUNCTION_CODES[function]
+        metrics.inc('model_predictions_total', len(pending), backend=backend.name)
+    return records
+
+def match_rules(utt):
+    """
+    Runs the rule cascade on an already lower-cased, stripped utterance.
+    Returns the matched dialogue function, or None if no rule applies.
+    """
+    # Questions, queries and Requests
+    if utt.endswith('?'):
+        if _REQUEST_RE.search(utt):
+            return 'Request'
+        if _QUESTION_RE.search(utt):
+            return 'Question'
+        return 'Query'
+    # Commitment (Ensure this check comes before Disagreement and Agreement)
+    if not _NEGATIVE_RE.search(utt) and _COMMITMENT_RE.search(utt):
+        return 'Commitment'
+    for function, pattern in _COMPILED_RULES:
+        if pattern.search(utt):
+            return function
+    return None
 
 def classify_function(utterance):
 
@@ -46,145 +309,10 @@ def classify_function(utterance):
     # --- Enhanced rules ---
     if not utt:
         return 'Statement'
-    # Questions, queries and Requests
-    if utt.endswith('?'):
-        if any(q in utt for q in ['can you', 'could you', 'would you', 'will you', 'shall we', 'please', 'would it be possible']):
-            return 'Request'
-        if any(q in utt for q in ['why', 'what', 'how', 'when', 'where', 'who', 'is it', 'are you', 'do you', 'does it', 'can it', 'could it', 'would it', 'will it', 'shall we', 'may I', 'might I']):
-            return 'Question'
-        return 'Query'
-    # Commitment (Ensure this check comes before Disagreement and Agreement)
-    negative_starts = [
-        "i'm not", "i am not", "i will not", "i won't", "i can't", "i shouldn't", "i couldn't", "i wouldn't", "i might", "i may", "i hope", "i plan", "i want", "i wish", "i would like", "i intend", "i expect", "i think", "i don't", "i guess", "i suppose", "i doubt", "i wonder"
-    ]
-    if not any(neg in utt for neg in negative_starts):
-        commitment_phrases = [
-            "i'm", "i am", "i will", "i'll", "i shall", "we will", "we'll", "we shall", "i can",
-            "i'll handle", "i'll take", "i'll do", "i'll get", "i'll make", "i'll see", "i'll ensure",
-            "i'll address", "i'll manage", "i'll finish", "i'll update", "i'll confirm", "i'll follow",
-            "i'll complete", "i'll work", "i'll start", "i'll lead", "i'll get started", "i'll get that",
-            "i'll make sure", "i'll take care", "i'll see to it", "i'll follow through", "i'll address it soon",
-            "i'll get started now", "i'll finish it soon", "i'll take the lead", "i'll update you",
-            "i'll confirm when finished", "i'll prepare", "i'll prepare a status update", "fair enough", "i'll help",
-            "we can", "we'll handle", "we'll take", "we'll do", "we'll get", "we'll make", "we'll see", "we'll ensure",
-            "we'll address", "we'll manage", "we'll finish", "we'll update", "we'll confirm", "we'll follow",
-            "we'll complete", "we'll work", "we'll start", "we'll lead", "we'll get started", "we'll get that",
-            "we'll make sure", "we'll take care", "we'll see to it", "we'll follow through", "we'll address it soon",
-            "we'll get started now", "we'll finish it soon", "we'll take the lead", "we'll update you",
-            "we'll confirm when finished", "we'll prepare", "we'll prepare a status update", "we'll help"
-            
-        ]
-        for phrase in commitment_phrases:
-            if phrase in utt:
-                return 'Commitment'
-    # Proposal
-    proposal_phrases = [
-        "how about", "let's", "maybe we could", "i propose", "shall we", "i suggest", "why don't we", "perhaps we should", 
-        "i recommend", "let us", "i'd like to propose", "i'd suggest", "i'd recommend", "i think we should", "maybe we hold off", 
-        "maybe we should", "then maybe we", "i think we could", "i think we can", "i think we might", "i think we may",
-        "i think we shall", "i think we will", "i think we ought to", "i think we need to", "i think we have to", "i think we must"
-    ]
-    if any(phrase in utt for phrase in proposal_phrases):
-        return 'Proposal'
-    # Deferral
-    deferral_phrases = [
-        "not yet", "on the roadmap", "let's come back", "we can discuss this next time", "let's postpone", "we'll revisit", 
-        "let's defer", "we'll talk about this later", "let's address this in the future", "we'll handle this next time", 
-        "let's leave this for now", "we'll return to this", "let's put this on hold", "we'll get back to this", "let's delay this", 
-        "we'll pick this up later", "let's save this for later", "we'll continue this later", "let's revisit this", "we'll postpone this", 
-        "let's discuss this later", "we'll come back to this"
-    ]
-    if any(phrase in utt for phrase in deferral_phrases):
-        return 'Deferral'
-    # Challenge
-    challenge_phrases = [
-        "are you sure", "can you prove", "is that really", "can you back that up", "are you certain", "can you show proof", 
-        "is that correct", "can you demonstrate", "are you positive", "can you verify", "is that true", "can you confirm", 
-        "can you justify", "is there evidence", "can you support", "is that verifiable", "can you show evidence", "is that provable", 
-        "i'd like to see evidence", "is that accurate", "is that right", "is that the case", "is that so", "is that confirmed", 
-        "is that valid", "is that supported"
-    ]
-    if any(phrase in utt for phrase in challenge_phrases):
-        return 'Challenge'
-    # Justification
-    justification_phrases = [
-        "because", "the reason", "due to", "as a result", "since", "that's why", "the cause", "the explanation", "the rationale", 
-        "the logic", "the basis", "the underlying reason", "the consequence", "the result", "the explanation is", "the reason is", 
-        "it's because", "it's due to", "it's a result of", "it's a consequence of", "it's the result of", "it's the cause of", 
-        "it's the reason for", "true, but", "the latest version uses"
-    ]
-    if any(phrase in utt for phrase in justification_phrases):
-        return 'Justification'
-    # Thanking
-    thanking_phrases = [
-        "thank", "thanks", "appreciate", "grateful", "gratitude", "much obliged", "owe you", "sincere thanks", "greatly appreciated", 
-        "immense thanks", "heartfelt thanks", "endless gratitude", "really appreciate", "thanks a ton", "thanks a million", 
-        "thank you for your time", "thanks again", "i owe you one"
-    ]
-    if any(phrase in utt for phrase in thanking_phrases):
-        return 'Thanking'
-    # Apology
-    apology_phrases = [
-        "sorry", "apolog", "pardon", "my apologies", "i apologize", "forgive me", "i didn't mean", "regret", "my fault", "my mistake", 
-        "inconvenience", "trouble", "oversight", "delay", "mix-up", "take responsibility"
-    ]
-    if any(phrase in utt for phrase in apology_phrases):
-        return 'Apology'
-    # Greeting
-    greeting_phrases = [
-        "hi", "hello", "good morning", "good afternoon", "good evening", "hey", "greetings", "welcome", "salutations", "nice to see you", 
-        "pleased to meet you", "how are you", "how's it going", "yo", "what's up", "hi all", "hi team", "hi everyone", "hi folks", "hi buddy", 
-        "hi friend", "hi pal", "hi fam", "hi again", "hello mate", "hello again", "hello folks", "hello team", "hello everyone", "hello all", 
-        "hello friend", "hello pal", "hello fam", "good to see you", "good day", "good night"
-    ]
-    if any(phrase in utt for phrase in greeting_phrases):
-        return 'Greeting'
-    # Closing
-    closing_phrases = [
-        "goodbye", "bye", "see you", "take care", "farewell", "catch you later", "see you soon", "see you around", "until next time", 
-        "later", "goodbye for now", "see you later", "all the best", "bye for now", "take it easy", "see you tomorrow", "goodbye everyone", 
-        "have a good one", "see you then"
-    ]
-    if any(phrase in utt for phrase in closing_phrases):
-        return 'Closing'
-    # Agreement
-    agreement_phrases = [
-        "i agree", "that makes sense", "absolutely", "i think you're right", "i support that", "i'm with you", "i concur", "that's true", 
-        "i believe so", "i'm in agreement", "i share your view", "i agree completely", "that's correct", "i agree 100%", "i'm on board", 
-        "i agree wholeheartedly", "that's my view too", "i see it the same way", "i agree entirely", "i'm in full agreement", "sure", 
-        "of course", "definitely", "yes"
-    ]
-    if any(phrase in utt for phrase in agreement_phrases):
-        return 'Agreement'
-    # Disagreement 
-    disagreement_phrases = [
-        "i'm not convinced", "i don't think", "i see it differently", "i'm not sure i agree", "i have a different opinion", "i disagree", 
-        "that's not how i see it", "i can't agree", "i don't share that view", "i beg to differ", "that's not my understanding", 
-        "i see things another way", "i don't believe that's right", "i have to disagree", "i respectfully disagree", "that's not accurate", 
-        "i don't think that's the case", "i don't see it that way", "i must disagree", "i can't support that", "no", "not really", "unfortunately"
-    ]
-    if any(phrase in utt for phrase in disagreement_phrases):
-        return 'Disagreement'
-    # Acknowledgement
-    acknowledgement_phrases = [
-        "okay", "ok", "alright", "got it", "understood", "noted", "i see", "thanks for letting me know", "i understand", "alright, thanks", 
-        "okay, got it", "i acknowledge", "alright, noted", "okay, understood", "i got it", "alright, i see", "okay, i understand", "alright, got it", 
-        "okay, thanks for the info", "i see, thanks"
-    ]
-    if any(phrase in utt for phrase in acknowledgement_phrases):
-        return 'Acknowledgement'
-    # Inform
-    inform_phrases = [
-        "i think", "i believe", "let me", "the reason", "because", "just to let you know", "for your information", "fyi", "just so you know", 
-        "this is to inform you", "just a heads up", "please be aware", "i thought you should know", "for your awareness", "just making you aware", 
-        "i wanted to inform you", "just to keep you posted", "for your reference", "just to update you", "i wanted to update you", "just to notify you", 
-        "for your records", "just to keep you informed"
-    ]
-    if any(phrase in utt for phrase in inform_phrases):
-        return 'Inform'
+    function = match_rules(utt)
+    if function is not None:
+        return function
     # Statement (default)
     # Log or flag utterances that fall to default for review
-    if utt:
-        with open(os.path.join(os.path.dirname(__file__), 'unclassified_utterances.log'), 'a', encoding='utf-8') as logf:
-            logf.write(f"[DEFAULT Statement] {utterance}\n")
-    return 'Statement'
\ No newline at end of file
+    unclassified_log.record(utterance)
+    return 'Statement'
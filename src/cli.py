@@ -0,0 +1,356 @@
+"""
+Command-line batch tool for classifying and summarising transcript archives.
+
+Run from the src directory:
+    python cli.py classify transcripts/ -o utterances.jsonl
+    python cli.py classify transcripts/ -o utterances/ --format parquet --processes 8
+    python cli.py summarise transcripts/ -o summaries.jsonl --workers 8
+    python cli.py classify transcripts/ -o utterances.jsonl --index corpus_index.json
+    cat meeting.txt | python cli.py classify            # JSONL on stdout
+
+Directories are walked for files matching --glob (default *.txt); '-' or no
+paths reads one transcript from stdin. Classification runs on a process pool
+(batch.classify_batch); summaries run on a thread pool, since they mostly wait
+on the LLM.
+
+Output is JSONL (one file, one record per line) or Parquet (a directory with one
+part per input file, readable with pandas.read_parquet(directory); needs pandas
+and pyarrow). A manifest beside the output (<output>.manifest.json) records the
+content hash of every finished file, so rerunning the same command skips
+unchanged files and an interrupted job resumes where it stopped. Pass
+--no-resume to start over.
+
+With --index, classify also writes a corpus-wide analytics.DialogueIndex. Each
+file's index counts are kept in the manifest, so a resumed run merges the
+skipped files without classifying them again.
+"""
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from analytics import DialogueIndex, build_index
+from batch import classify_batch
+from classify import classify_utterances, unclassified_log
+from records import as_dicts
+
+MANIFEST_VERSION = 1
+# The manifest is rewritten at most this often (and always at the end)
+CHECKPOINT_SECONDS = 5.0
+FAILED_SUMMARY_PREFIX = "[Gemini summarization failed"
+
+
+def iter_inputs(paths, pattern='*.txt'):
+    """Yields file paths: files as given, directories walked for pattern, in sorted order."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(fnmatch.filter(files, pattern)):
+                    yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            raise FileNotFoundError(path)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class Manifest:
+    """
+    Checkpoint of finished input files, keyed by path. Each entry holds the file's
+    sha256 plus its size and mtime, so unchanged files are recognised without
+    re-hashing them; the hash decides when size or mtime differ.
+    """
+    def __init__(self, path, command, resume=True):
+        self.path = path
+        self.command = command
+        self.files = {}
+        self._saved = time.monotonic()
+        if resume and path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION and data.get('command') == command:
+                self.files = data['files']
+
+    def check(self, path):
+        """Returns (sha256, done) for path; done means it is finished and unchanged."""
+        stat = os.stat(path)
+        entry = self.files.get(path)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256'], True
+        sha256 = file_digest(path)
+        if entry is not None and entry['sha256'] == sha256:
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            return sha256, True
+        return sha256, False
+
+    def mark(self, path, sha256, **info):
+        stat = os.stat(path)
+        self.files[path] = dict(info, sha256=sha256, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        if time.monotonic() - self._saved >= CHECKPOINT_SECONDS:
+            self.save()
+
+    def forget(self, path):
+        self.files.pop(path, None)
+
+    def save(self):
+        if self.path:
+            _write_atomic(self.path, json.dumps(
+                {'version': MANIFEST_VERSION, 'command': self.command, 'files': self.files}))
+        self._saved = time.monotonic()
+
+
+class JsonlWriter:
+    """
+    Writes records to one JSONL file (or stdout when path is None). On resume, rows
+    from sources that are not marked done in the manifest are dropped first, so a
+    file that changed, or was cut off by a crash, is never written twice.
+    """
+    def __init__(self, path, keep_sources=None):
+        self.path = path
+        if path is None:
+            self._f = sys.stdout
+            return
+        if keep_sources and os.path.exists(path):
+            self._f = self._rewrite(path, keep_sources)
+        else:
+            self._f = open(path, 'w', encoding='utf-8')
+
+    @staticmethod
+    def _rewrite(path, keep_sources):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-')
+        with open(path, encoding='utf-8') as old, os.fdopen(fd, 'w', encoding='utf-8') as new:
+            for line in old:
+                try:
+                    source = json.loads(line).get('source')
+                except ValueError:
+                    continue  # a partial last line from an interrupted run
+                if source in keep_sources:
+                    new.write(line)
+        os.replace(tmp, path)
+        return open(path, 'a', encoding='utf-8')
+
+    def write(self, source, rows):
+        for row in rows:
+            self._f.write(json.dumps(dict(row, source=source), ensure_ascii=False) + '\n')
+        # Flushed before the manifest can mark source as done
+        self._f.flush()
+
+    def close(self):
+        if self._f is not sys.stdout:
+            self._f.close()
+
+
+class ParquetWriter:
+    """Writes one Parquet part per source into a directory; a rerun overwrites the part."""
+    def __init__(self, directory):
+        try:
+            import pandas as pd
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pandas and pyarrow (pip install pandas pyarrow).")
+        self._pd = pd
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, source, rows):
+        name = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+        part = os.path.join(self.directory, f'part-{name}.parquet')
+        rows = [dict(row, source=source) for row in rows]
+        if not rows:
+            # An empty part has no columns and would break reading the directory
+            if os.path.exists(part):
+                os.remove(part)
+            return
+        tmp = os.path.join(self.directory, f'.tmp-{name}.parquet')
+        self._pd.DataFrame(rows).to_parquet(tmp, index=False)
+        os.replace(tmp, part)
+
+    def close(self):
+        pass
+
+
+def _open_output(args, manifest, pending):
+    if args.format == 'parquet':
+        return ParquetWriter(args.output)
+    keep = set(manifest.files) - set(pending) if manifest.path else None
+    return JsonlWriter(args.output, keep)
+
+
+def _plan(args, manifest):
+    """Returns {path: sha256} for the inputs that still need processing, and the skip count."""
+    pending, skipped = {}, 0
+    seen = set()
+    for path in iter_inputs(args.paths, args.glob):
+        if path in seen:
+            continue
+        seen.add(path)
+        sha256, done = manifest.check(path)
+        if done and getattr(args, 'index', None) and 'index' not in manifest.files[path]:
+            done = False  # finished by a run without --index
+        if done:
+            skipped += 1
+        else:
+            manifest.forget(path)
+            pending[path] = sha256
+    return pending, skipped
+
+
+def run_classify(args, manifest, pending, writer):
+    count = 0
+    for source, utterances in classify_batch(pending, processes=args.processes, ordered=False, paths=True):
+        writer.write(source, as_dicts(utterances))
+        info = {'utterances': len(utterances)}
+        if args.index:
+            info['index'] = build_index(utterances).to_dict(offsets=False)
+        manifest.mark(source, pending[source], **info)
+        count += 1
+    return count
+
+
+def write_corpus_index(path, manifest):
+    """Merges the per-file index counts in the manifest into one corpus index at path."""
+    corpus = DialogueIndex.merge_all(DialogueIndex.from_dict(entry['index'])
+                                     for entry in manifest.files.values() if 'index' in entry)
+    _write_atomic(path, corpus.to_json(offsets=False))
+    return corpus
+
+
+def _summarise_file(path):
+    from summarise import generate_summary
+    with open(path, encoding='utf-8', errors='replace') as f:
+        transcript = f.read()
+    utterances = classify_utterances(transcript)
+    return generate_summary(transcript, utterances=utterances), len(utterances)
+
+
+def run_summarise(args, manifest, pending, writer):
+    count = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(_summarise_file, path): path for path in pending}
+        for future in as_completed(futures):
+            path = futures[future]
+            summary, utterances = future.result()
+            writer.write(path, [{'utterances': utterances, 'summary': summary}])
+            # Failed LLM calls are written but not checkpointed, so a rerun retries them
+            if not summary.startswith(FAILED_SUMMARY_PREFIX):
+                manifest.mark(path, pending[path], utterances=utterances)
+            count += 1
+    return count
+
+
+def run_stdin(args):
+    from summarise import generate_summary
+    transcript = sys.stdin.read()
+    utterances = classify_utterances(transcript)
+    if args.command == 'classify':
+        rows = as_dicts(utterances)
+    else:
+        rows = [{'utterances': len(utterances), 'summary': generate_summary(transcript, utterances=utterances)}]
+    writer = ParquetWriter(args.output) if args.format == 'parquet' else JsonlWriter(args.output)
+    writer.write('<stdin>', rows)
+    writer.close()
+    if getattr(args, 'index', None):
+        _write_atomic(args.index, build_index(utterances).to_json())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Classify or summarise transcript files in bulk.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('classify', "classify every utterance"), ('summarise', "summarise each transcript")):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument('paths', nargs='*', default=['-'], help="files or directories; '-' reads stdin")
+        sub.add_argument('-o', '--output', help="JSONL file or Parquet directory (default: JSONL on stdout)")
+        sub.add_argument('--format', choices=('jsonl', 'parquet'),
+                         help="default: jsonl for *.jsonl, parquet for a directory or a name without a suffix")
+        sub.add_argument('--glob', default='*.txt', help="file pattern when walking directories")
+        sub.add_argument('--manifest', help="checkpoint file (default: next to the output)")
+        sub.add_argument('--no-resume', action='store_true', help="ignore the manifest and reprocess everything")
+        if name == 'classify':
+            sub.add_argument('--processes', type=int, help="worker processes (default: all cores)")
+            sub.add_argument('--index', help="also write the merged corpus analytics index (JSON) here")
+        else:
+            sub.add_argument('--workers', type=int, default=4, help="concurrent LLM calls")
+    return parser
+
+
+def infer_format(output):
+    """'jsonl' for stdout or a .jsonl file, 'parquet' for a directory, None if the name is ambiguous."""
+    if output is None or output.endswith('.jsonl'):
+        return 'jsonl'
+    if os.path.isdir(output) or output.endswith(('/', os.sep)):
+        return 'parquet'
+    suffix = os.path.splitext(output)[1]
+    if suffix == '.parquet' or not suffix:
+        return 'parquet'
+    return None
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.format is None:
+        args.format = infer_format(args.output)
+        if args.format is None:
+            parser.error(f"cannot tell the output format from {args.output!r}: "
+                         "use a .jsonl file, a directory name without a suffix, or --format")
+    if args.format == 'parquet' and args.output is None:
+        parser.error("--format parquet needs --output DIRECTORY")
+
+    if args.paths == ['-']:
+        run_stdin(args)
+        return 0
+    if '-' in args.paths:
+        parser.error("'-' (stdin) cannot be combined with file paths")
+
+    manifest_path = args.manifest
+    if manifest_path is None and args.output is not None:
+        # Kept beside (not inside) a Parquet directory so the directory reads as one dataset
+        manifest_path = args.output.rstrip('/\\') + '.manifest.json'
+    manifest = Manifest(manifest_path, args.command, resume=not args.no_resume)
+    try:
+        pending, skipped = _plan(args, manifest)
+    except FileNotFoundError as e:
+        parser.error(f"no such file or directory: {e}")
+
+    start = time.perf_counter()
+    writer = _open_output(args, manifest, pending)
+    try:
+        if args.command == 'classify':
+            done = run_classify(args, manifest, pending, writer)
+        else:
+            done = run_summarise(args, manifest, pending, writer)
+    finally:
+        writer.close()
+        manifest.save()
+        unclassified_log.flush()
+    if getattr(args, 'index', None):
+        corpus = write_corpus_index(args.index, manifest)
+        print(f"index: {corpus.utterances} utterances from {corpus.transcripts} transcripts", file=sys.stderr)
+    print(f"{args.command}: {done} files processed, {skipped} unchanged skipped "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
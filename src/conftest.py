@@ -0,0 +1,10 @@
+"""Shared pytest fixtures (run pytest from src/)."""
+import pytest
+
+import classify
+
+
+@pytest.fixture(autouse=True)
+def no_review_log(monkeypatch):
+    # unclassified_utterances.log is tracked and feeds the golden corpus, so tests must not append to it
+    monkeypatch.setattr(classify.unclassified_log, 'enabled', False)
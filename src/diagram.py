@@ -0,0 +1,100 @@
+"""
+Mermaid dialogue-flow diagrams, shared by the Flask and Streamlit interfaces.
+
+Modes:
+    flow         one node per utterance (the original diagram)
+    runs         consecutive utterances with the same speaker and function collapsed into one node
+    transitions  one node per speaker/function pair, edges weighted by how often one follows the other
+    auto         (default) the first of the above that fits in max_nodes
+
+Every mode builds its text in one pass over the utterances and never emits more
+than max_nodes nodes, so long meetings stay renderable in the browser.
+"""
+from collections import Counter
+
+import metrics
+
+DEFAULT_MAX_NODES = 200
+
+
+def _label(text):
+    # Double quotes would end a Mermaid node label early
+    return text.replace('"', '#quot;')
+
+
+def collapse_runs(utterances):
+    """Returns [(speaker, function, count)] for consecutive same-speaker/same-function runs."""
+    runs = []
+    for u in utterances:
+        if runs and runs[-1][0] == u['speaker'] and runs[-1][1] == u['function']:
+            runs[-1][2] += 1
+        else:
+            runs.append([u['speaker'], u['function'], 1])
+    return [tuple(run) for run in runs]
+
+
+def _chain(direction, labels, total, max_nodes):
+    # A linear chain of nodes; anything beyond the budget is summarised by a last node.
+    if max_nodes and len(labels) > max_nodes:
+        hidden = total - sum(count for _, count in labels[:max_nodes - 1])
+        labels = labels[:max_nodes - 1] + [(f"... {hidden} more utterances", hidden)]
+    nodes = [f'U{i}["{_label(label)}"]' for i, (label, _) in enumerate(labels)]
+    edges = [f"U{i - 1} --> U{i}" for i in range(1, len(labels))]
+    return f"graph {direction}\n" + "\n".join(nodes + edges)
+
+
+def flow_diagram(utterances, direction="TD", max_nodes=None):
+    labels = [(f"{u['speaker']}: {u['function']}", 1) for u in utterances]
+    return _chain(direction, labels, len(labels), max_nodes)
+
+
+def run_length_diagram(utterances, direction="TD", max_nodes=None, runs=None):
+    if runs is None:
+        runs = collapse_runs(utterances)
+    labels = []
+    for speaker, function, count in runs:
+        suffix = f" x{count}" if count > 1 else ""
+        labels.append((f"{speaker}: {function}{suffix}", count))
+    return _chain(direction, labels, len(utterances), max_nodes)
+
+
+def transition_diagram(utterances, direction="TD", max_nodes=DEFAULT_MAX_NODES, max_edges=None):
+    """
+    Speaker-by-function transition graph. If there are more speaker/function pairs
+    than max_nodes, the least frequent are merged into one 'Other' node; only the
+    max_edges heaviest edges are drawn (default 2 * max_nodes).
+    """
+    pairs = [(u['speaker'], u['function']) for u in utterances]
+    counts = Counter(pairs)
+    if max_nodes and len(counts) > max_nodes:
+        kept = {pair for pair, _ in counts.most_common(max_nodes - 1)}
+        pairs = [pair if pair in kept else ('Other', '') for pair in pairs]
+        counts = Counter(pairs)
+    ids = {pair: f"N{i}" for i, pair in enumerate(counts)}
+    transitions = Counter(zip(pairs, pairs[1:]))
+    if max_edges is None:
+        max_edges = 2 * max_nodes if max_nodes else None
+    nodes = []
+    for (speaker, function), count in counts.items():
+        label = f"{speaker}: {function} ({count})" if function else f"{speaker} ({count})"
+        nodes.append(f'{ids[(speaker, function)]}["{_label(label)}"]')
+    edges = [f"{ids[a]} -->|{weight}| {ids[b]}" for (a, b), weight in transitions.most_common(max_edges)]
+    return f"graph {direction}\n" + "\n".join(nodes + edges)
+
+
+@metrics.timed("mermaid")
+def generate_mermaid_diagram(utterances, direction="TD", mode="auto", max_nodes=DEFAULT_MAX_NODES):
+    if mode == "flow":
+        return flow_diagram(utterances, direction, max_nodes)
+    if mode == "runs":
+        return run_length_diagram(utterances, direction, max_nodes)
+    if mode == "transitions":
+        return transition_diagram(utterances, direction, max_nodes)
+    if mode != "auto":
+        raise ValueError(f"Unknown diagram mode: {mode}")
+    if not max_nodes or len(utterances) <= max_nodes:
+        return flow_diagram(utterances, direction)
+    runs = collapse_runs(utterances)
+    if len(runs) <= max_nodes:
+        return run_length_diagram(utterances, direction, runs=runs)
+    return transition_diagram(utterances, direction, max_nodes)
@@ -0,0 +1,54 @@
+"""
+Incremental classification for transcripts that are edited and resubmitted.
+
+Classification of a line depends only on its text, so results are cached per line
+and only new or changed lines go through the classifier. The cache is pruned to the
+lines of the latest transcript on every call, so it never outgrows one transcript.
+signature identifies the labelled utterances of the last call, letting callers skip
+re-summarising when an edit did not change them (e.g. whitespace or non-dialogue lines).
+"""
+import hashlib
+
+import metrics
+from classify import apply_backend, classify_lines
+
+
+class IncrementalClassifier:
+    def __init__(self):
+        self.signature = None
+        self.reused = 0
+        self.classified = 0
+        self._lines = {}
+
+    @metrics.timed('classify_incremental')
+    def classify(self, transcript):
+        """Returns the same records as classify_utterances(transcript)."""
+        previous = self._lines
+        current = {}
+        lines = transcript.strip().split('\n')
+        new_lines = []
+        self.reused = 0
+        for line in lines:
+            if line in current:
+                continue
+            if line in previous:
+                current[line] = previous[line]
+                self.reused += 1
+            else:
+                current[line] = None
+                new_lines.append(line)
+        # Only new or changed lines are parsed and go through the rules, as one batch
+        fresh = classify_lines(new_lines)
+        current.update(zip(new_lines, fresh))
+        fresh = [record for record in fresh if record is not None]
+        self.classified = len(new_lines)
+        utterances = [current[line] for line in lines if current[line] is not None]
+        # New lines go through the statistical backend (if any) as one batch
+        apply_backend(fresh)
+        digest = hashlib.sha1()
+        for record in utterances:
+            digest.update(f"{record.speaker}\0{record.utterance}\0{record.code}\n".encode('utf-8'))
+        self._lines = current
+        metrics.inc_each('utterances_total', 'function', (u.function for u in fresh))
+        self.signature = digest.hexdigest()
+        return utterances
@@ -0,0 +1,71 @@
+"""
+Bounded background job queue for slow work such as LLM summarisation.
+
+Jobs run on their own thread pool, so they never hold up request threads that
+only classify. Each job gets an ID that can be polled; finished jobs are kept for
+result_ttl seconds. submit() raises QueueFull once max_pending jobs are waiting or
+running, so a burst of summaries is rejected early instead of piling up.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, max_workers=4, max_pending=64, result_ttl=600):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedules fn(*args, **kwargs) and returns the new job ID."""
+        with self._lock:
+            self._prune()
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {'id': job_id, 'status': 'queued', 'submitted': time.time()}
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        """Returns a copy of the job's state, or None if it is unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending, 'tracked': len(self._jobs)}
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status='running', started=time.time())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._update(job_id, status='failed', error=str(e), finished=time.time())
+        else:
+            self._update(job_id, status='done', result=result, finished=time.time())
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.get('finished', float('inf')) < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -1,27 +1,29 @@
-from flask import Flask, request, render_template
-from classify import classify_utterances
-from summarise import generate_summary
+from flask import Flask, Response, jsonify, request, render_template, url_for
+from diagram import generate_mermaid_diagram
+from jobs import JobQueue, QueueFull
+from pipeline import DialoguePipeline
+from records import as_dicts
+import metrics
 import os
-
-def generate_mermaid_diagram(utterances):
-    nodes = []
-    edges = []
-    for i, u in enumerate(utterances):
-        node_id = f"U{i}"
-        label = f"{u['speaker']}: {u['function']}"
-        nodes.append(f"{node_id}[{label}]")
-        if i > 0:
-            edges.append(f"U{i-1} --> U{i}")
-    diagram = "graph TD\n" + "\n".join(nodes + edges)
-    return diagram
+import sys
 
 app = Flask(__name__)
+# Uploads and API bodies larger than this are rejected with 413
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 10 * 1024 * 1024))
+
+# Summaries can wait on the LLM for seconds, so they run on their own bounded pool
+# and never hold up request threads that only classify.
+summary_jobs = JobQueue(
+    max_workers=int(os.getenv('SUMMARY_WORKERS', '4')),
+    max_pending=int(os.getenv('SUMMARY_MAX_PENDING', '64')),
+)
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     transcript = ''
     utterances = []
     summary = ''
+    summary_url = ''
     mermaid_diagram = ''
     if request.method == 'POST':
         if 'file' in request.files and request.files['file'].filename:
@@ -30,11 +32,93 @@ def index():
         else:
             transcript = request.form.get('transcript', '')
         if transcript.strip():
-            utterances = classify_utterances(transcript)
-            summary = generate_summary(transcript)
-            mermaid_diagram = generate_mermaid_diagram(utterances)
-    return render_template('index.html', transcript=transcript, utterances=utterances, summary=summary, mermaid_diagram=mermaid_diagram)
+            pipeline = DialoguePipeline(transcript)
+            utterances = pipeline.utterances
+            # The page renders straight away and polls the job for the summary
+            try:
+                job_id = summary_jobs.submit(_summarise_job, transcript, utterances)
+                summary_url = url_for('api_job', job_id=job_id)
+            except QueueFull:
+                summary = "Too many summaries in progress, try again shortly."
+            mermaid_diagram = pipeline.mermaid(generate_mermaid_diagram)
+    return render_template('index.html', transcript=transcript, utterances=utterances, summary=summary,
+                           summary_url=summary_url, mermaid_diagram=mermaid_diagram)
+
+# === JSON API ===
+def _api_transcript():
+    # Accepts {"transcript": "..."}, a multipart 'file' upload, or a text/plain body
+    if request.is_json:
+        data = request.get_json(silent=True)
+        transcript = data.get('transcript', '') if isinstance(data, dict) else ''
+        return transcript if isinstance(transcript, str) else ''
+    if 'file' in request.files and request.files['file'].filename:
+        return request.files['file'].read().decode('utf-8', errors='replace')
+    return request.get_data(as_text=True)
+
+def _summarise_job(transcript, utterances=None):
+    return DialoguePipeline(transcript, utterances=utterances).summary
+
+@app.route('/api/classify', methods=['POST'])
+def api_classify():
+    transcript = _api_transcript()
+    if not transcript.strip():
+        return jsonify(error="No transcript provided."), 400
+    utterances = DialoguePipeline(transcript).utterances
+    return jsonify(utterances=as_dicts(utterances), count=len(utterances))
+
+@app.route('/api/summarise', methods=['POST'])
+def api_summarise():
+    transcript = _api_transcript()
+    if not transcript.strip():
+        return jsonify(error="No transcript provided."), 400
+    try:
+        job_id = summary_jobs.submit(_summarise_job, transcript)
+    except QueueFull:
+        return jsonify(error="Too many summaries in progress, try again shortly."), 503, {'Retry-After': '5'}
+    status_url = url_for('api_job', job_id=job_id)
+    return jsonify(job_id=job_id, status='queued', status_url=status_url), 202, {'Location': status_url}
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job(job_id):
+    job = summary_jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown or expired job."), 404
+    body = {'job_id': job_id, 'status': job['status']}
+    if job['status'] == 'done':
+        body['summary'] = job['result']
+    elif job['status'] == 'failed':
+        body['error'] = job['error']
+    return jsonify(body)
+
+# === Metrics ===
+@app.after_request
+def count_request(response):
+    if metrics.enabled:
+        metrics.inc('http_requests_total', endpoint=request.endpoint or 'unknown', status=response.status_code)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Prometheus text format; counters are per process, so scrape each worker
+    stats = summary_jobs.stats()
+    body = metrics.render_prometheus() + (
+        "# TYPE dialogue_summary_jobs_pending gauge\n"
+        f"dialogue_summary_jobs_pending {stats['pending']}\n"
+    )
+    return Response(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.errorhandler(413)
+def too_large(e):
+    if request.path.startswith('/api/'):
+        return jsonify(error=f"Request body exceeds {app.config['MAX_CONTENT_LENGTH']} bytes."), 413
+    return e
 
 if __name__ == '__main__':
-    # Only run the Flask development server if executed directly (Not when imported by Streamlit)
-    app.run(debug=True)
\ No newline at end of file
+    if '--production' in sys.argv:
+        # Multi-threaded production server; alternatively run `gunicorn --threads 8 main:app` from src/
+        from waitress import serve
+        serve(app, host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORT', '5000')),
+              threads=int(os.getenv('THREADS', '8')))
+    else:
+        # Only run the Flask development server if executed directly (Not when imported by Streamlit)
+        app.run(debug=True)
@@ -0,0 +1,169 @@
+"""
+Lightweight per-process instrumentation for the dialogue pipeline.
+
+Stages are timed with the timer() context manager or the @timed decorator, and
+events are counted with inc(). render_prometheus() exposes everything in the
+Prometheus text format (served at /metrics by the Flask app). Set METRICS=off to
+disable it; timers and counters then cost one flag check.
+
+Example:
+    with metrics.timer('mermaid'):
+        diagram = generate_mermaid_diagram(utterances)
+    metrics.inc_each('utterances_total', 'function', (u['function'] for u in utterances))
+"""
+import functools
+import threading
+import time
+from collections import Counter
+
+from settings import env_flag
+
+enabled = env_flag('METRICS')
+
+PREFIX = 'dialogue_'
+
+_lock = threading.Lock()
+_timers = {}    # stage -> [count, total seconds, max seconds]
+_counters = {}  # (name, sorted label items) -> value
+
+
+def observe(stage, seconds):
+    with _lock:
+        entry = _timers.get(stage)
+        if entry is None:
+            _timers[stage] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+
+def inc(name, value=1, **labels):
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def inc_each(name, label, values):
+    """Counts each of values under name{label=value}, taking the lock once."""
+    if not enabled:
+        return
+    counts = Counter(values)
+    with _lock:
+        for value, count in counts.items():
+            key = (name, ((label, value),))
+            _counters[key] = _counters.get(key, 0) + count
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(stage):
+    """Context manager that records the duration of the block under stage."""
+    return _Timer(stage) if enabled else _NULL_TIMER
+
+
+def timed(stage):
+    """Decorator form of timer()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def record_llm(seconds, prompt, response=None, error=False):
+    """Records one upstream LLM call: latency, outcome and estimated tokens."""
+    if not enabled:
+        return
+    observe('llm', seconds)
+    inc('llm_requests_total', outcome='error' if error else 'ok')
+    # Roughly four characters per token, as in summarise.estimate_tokens
+    inc('llm_tokens_total', len(prompt) // 4 + 1, direction='prompt')
+    if response is not None:
+        inc('llm_tokens_total', len(response) // 4 + 1, direction='response')
+
+
+def snapshot():
+    """Returns {'stages': {stage: {...}}, 'counters': {(name, labels): value}}."""
+    with _lock:
+        stages = {stage: {'count': count, 'seconds': total, 'max_seconds': longest,
+                          'mean_seconds': total / count}
+                  for stage, (count, total, longest) in _timers.items()}
+        counters = dict(_counters)
+    return {'stages': stages, 'counters': counters}
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def _labels(items):
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+def render_prometheus():
+    snap = snapshot()
+    lines = [
+        f"# HELP {PREFIX}stage_seconds Time spent per pipeline stage.",
+        f"# TYPE {PREFIX}stage_seconds summary",
+    ]
+    for stage, s in sorted(snap['stages'].items()):
+        lines.append(f'{PREFIX}stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+        lines.append(f'{PREFIX}stage_seconds_sum{{stage="{stage}"}} {s["seconds"]:.6f}')
+    lines.append(f"# TYPE {PREFIX}stage_seconds_max gauge")
+    for stage, s in sorted(snap['stages'].items()):
+        lines.append(f'{PREFIX}stage_seconds_max{{stage="{stage}"}} {s["max_seconds"]:.6f}')
+    names = sorted({name for name, _ in snap['counters']})
+    for name in names:
+        lines.append(f"# TYPE {PREFIX}{name} counter")
+        for (counter, labels), value in sorted(snap['counters'].items()):
+            if counter == name:
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+    by_function = {dict(labels).get('function'): value
+                   for (name, labels), value in snap['counters'].items() if name == 'utterances_total'}
+    total = sum(by_function.values())
+    if total:
+        lines.append(f"# HELP {PREFIX}default_statement_ratio Share of utterances that fell back to 'Statement'.")
+        lines.append(f"# TYPE {PREFIX}default_statement_ratio gauge")
+        lines.append(f"{PREFIX}default_statement_ratio {by_function.get('Statement', 0) / total:.6f}")
+    return '\n'.join(lines) + '\n'
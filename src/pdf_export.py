@@ -0,0 +1,174 @@
+"""
+PDF export of summaries and classified utterances.
+
+Text is wrapped to the page width and flowed across as many pages as needed, and
+the optional utterance table repeats its header on every page. Words wider than a
+line or cell are split by character. Each page is compressed as it is finished,
+but reportlab keeps all finished pages in memory until save(), so memory still
+grows with the size of the report. Output can go to a path or any binary stream;
+pdf_bytes() memoises the rendered bytes per content hash so a Streamlit rerun
+with an unchanged summary does not render again.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+import metrics
+
+MARGIN = 40
+FONT = "Helvetica"
+BOLD_FONT = "Helvetica-Bold"
+FONT_SIZE = 11
+LEADING = 15
+# Relative widths of the Speaker, Function and Utterance columns
+TABLE_COLUMNS = (("Speaker", 0.18), ("Function", 0.18), ("Utterance", 0.64))
+CELL_PADDING = 4
+
+
+def split_lines(text, width, font=FONT, size=FONT_SIZE):
+    """
+    Wraps one paragraph to width points. simpleSplit breaks only at spaces, so a
+    token wider than the line (a URL, a long identifier) is then split by character.
+    """
+    lines = []
+    for line in simpleSplit(text, font, size, width):
+        if " " in line.strip():
+            # simpleSplit puts an overlong word on a line of its own, so this one fits
+            lines.append(line)
+            continue
+        while stringWidth(line, font, size) > width and len(line) > 1:
+            # Longest prefix that fits, but always at least one character
+            end = 1
+            while end < len(line) and stringWidth(line[:end + 1], font, size) <= width:
+                end += 1
+            lines.append(line[:end])
+            line = line[end:].lstrip(" ")
+        if line:
+            lines.append(line)
+    return lines
+
+
+def wrap_text(text, width, font=FONT, size=FONT_SIZE):
+    """Yields lines of text wrapped to width points; blank lines are kept."""
+    for paragraph in text.split("\n"):
+        lines = split_lines(paragraph, width, font, size)
+        if not lines:
+            yield ""
+        for line in lines:
+            yield line
+
+
+class _PageWriter:
+    def __init__(self, out, pagesize, title):
+        self.canvas = canvas.Canvas(out, pagesize=pagesize, pageCompression=1)
+        self.canvas.setTitle(title)
+        self.width, self.height = pagesize
+        self.pages = 1
+        self.y = self.height - MARGIN
+        self.on_new_page = None
+
+    def ensure_space(self, needed):
+        if self.y - needed < MARGIN:
+            self.canvas.showPage()
+            self.pages += 1
+            self.y = self.height - MARGIN
+            if self.on_new_page is not None:
+                self.on_new_page()
+
+    def text_line(self, x, text, font=FONT, size=FONT_SIZE):
+        self.ensure_space(LEADING)
+        self.canvas.setFont(font, size)
+        self.canvas.drawString(x, self.y - size, text)
+        self.y -= LEADING
+
+
+def _write_table(writer, utterances):
+    usable = writer.width - 2 * MARGIN
+    widths = [usable * share for _, share in TABLE_COLUMNS]
+    xs = [MARGIN]
+    for w in widths[:-1]:
+        xs.append(xs[-1] + w)
+
+    def header():
+        writer.canvas.setFont(BOLD_FONT, FONT_SIZE)
+        for (name, _), x in zip(TABLE_COLUMNS, xs):
+            writer.canvas.drawString(x + CELL_PADDING, writer.y - FONT_SIZE, name)
+        writer.y -= LEADING
+        writer.canvas.line(MARGIN, writer.y + 3, MARGIN + usable, writer.y + 3)
+
+    writer.ensure_space(2 * LEADING)
+    header()
+    writer.on_new_page = header
+    for u in utterances:
+        cells = [
+            split_lines(str(value), width - 2 * CELL_PADDING) or [""]
+            for value, width in zip((u['speaker'], u['function'], u['utterance']), widths)
+        ]
+        rows = max(len(cell) for cell in cells)
+        for i in range(rows):
+            # A long utterance may continue on the next page, under a repeated header
+            writer.ensure_space(LEADING)
+            writer.canvas.setFont(FONT, FONT_SIZE)
+            for cell, x in zip(cells, xs):
+                if i < len(cell):
+                    writer.canvas.drawString(x + CELL_PADDING, writer.y - FONT_SIZE, cell[i])
+            writer.y -= LEADING
+    writer.on_new_page = None
+
+
+@metrics.timed("pdf")
+def write_pdf(out, summary, utterances=None, title="Dialogue Summary", pagesize=A4):
+    """
+    Writes the summary (and, if given, a table of classified utterances) as a PDF
+    to out, a file path or binary stream. Returns the number of pages written.
+    """
+    writer = _PageWriter(out, pagesize, title)
+    text_width = writer.width - 2 * MARGIN
+    writer.text_line(MARGIN, title, BOLD_FONT, 16)
+    writer.y -= LEADING / 2
+    for line in wrap_text(summary, text_width):
+        writer.text_line(MARGIN, line)
+    if utterances:
+        writer.y -= LEADING
+        writer.text_line(MARGIN, "Classified Utterances", BOLD_FONT, 13)
+        _write_table(writer, utterances)
+    writer.canvas.save()
+    return writer.pages
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_SIZE = 16
+
+
+def _content_hash(summary, utterances, title):
+    digest = hashlib.sha256()
+    digest.update(title.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(summary.encode('utf-8'))
+    for u in utterances or ():
+        digest.update(f"\0{u['speaker']}\0{u['function']}\0{u['utterance']}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def pdf_bytes(summary, utterances=None, title="Dialogue Summary"):
+    """Returns the PDF as bytes, reusing the last rendering of identical content."""
+    key = _content_hash(summary, utterances, title)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    buffer = BytesIO()
+    write_pdf(buffer, summary, utterances, title)
+    data = buffer.getvalue()
+    with _cache_lock:
+        _cache[key] = data
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data
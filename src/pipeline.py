@@ -0,0 +1,42 @@
+"""
+Single-pass processing of a transcript: the transcript is parsed and classified once,
+and the same utterances feed the summary, analytics index, Mermaid diagram and PDF export.
+"""
+from functools import cached_property
+
+import metrics
+from analytics import build_index
+from classify import classify_utterances
+from summary_client import get_client
+
+
+class DialoguePipeline:
+    def __init__(self, transcript, utterances=None):
+        self.transcript = transcript
+        if utterances is not None:
+            # Already classified, e.g. by an IncrementalClassifier
+            self.utterances = utterances
+
+    @cached_property
+    def utterances(self):
+        return classify_utterances(self.transcript)
+
+    @cached_property
+    def index(self):
+        """Speaker/function offsets, transitions and adjacency pairs (analytics.DialogueIndex)."""
+        return build_index(self.utterances)
+
+    @cached_property
+    def summary(self):
+        # The shared client bounds the LLM call with a deadline (falling back to the
+        # rule-based summary) and coalesces identical concurrent requests.
+        with metrics.timer('summary'):
+            return get_client().summarise(self.transcript, utterances=self.utterances, index=self.index)
+
+    def mermaid(self, generate_diagram, **kwargs):
+        """Builds a diagram from the classified utterances with the given generator."""
+        return generate_diagram(self.utterances, **kwargs)
+
+    def pdf(self, generate_pdf):
+        """Renders the summary with the given PDF generator."""
+        return generate_pdf(self.summary)
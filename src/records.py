@@ -0,0 +1,69 @@
+"""
+Compact utterance records.
+
+An Utterance stores its speaker (interned), text, a small-integer function code
+and a confidence in __slots__, instead of a five-key dict per line. The rationale
+string is derived from the function on access, so every utterance with the same
+label shares one string. Records behave as read-only mappings with the old keys
+('speaker', 'utterance', 'function', 'confidence', 'rationale'), so templates,
+summaries and comparisons with dicts keep working; use to_dict() or as_dicts()
+where real dicts are needed (e.g. JSON or st.dataframe).
+"""
+import sys
+from collections.abc import Mapping
+
+# Dialogue function labels; an Utterance stores the index into this tuple.
+FUNCTIONS = (
+    'Statement', 'Request', 'Question', 'Query', 'Commitment', 'Proposal', 'Deferral', 'Challenge',
+    'Justification', 'Thanking', 'Apology', 'Greeting', 'Closing', 'Agreement', 'Disagreement',
+    'Acknowledgement', 'Inform',
+)
+FUNCTION_CODES = {function: code for code, function in enumerate(FUNCTIONS)}
+RATIONALES = tuple(f"Classified as {function} based on keywords/rules." for function in FUNCTIONS)
+MODEL_RATIONALES = tuple(f"Classified as {function} by the statistical model." for function in FUNCTIONS)
+
+KEYS = ('speaker', 'utterance', 'function', 'confidence', 'rationale')
+
+
+class Utterance(Mapping):
+    __slots__ = ('speaker', 'utterance', 'code', 'confidence')
+
+    def __init__(self, speaker, utterance, function, confidence=1.0):
+        self.speaker = sys.intern(speaker)
+        self.utterance = utterance
+        self.code = FUNCTION_CODES[function]
+        self.confidence = confidence
+
+    @property
+    def function(self):
+        return FUNCTIONS[self.code]
+
+    @property
+    def rationale(self):
+        # Rule matches always have confidence 1.0; model labels carry a probability
+        return RATIONALES[self.code] if self.confidence == 1.0 else MODEL_RATIONALES[self.code]
+
+    def __getitem__(self, key):
+        if key not in KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(KEYS)
+
+    def __len__(self):
+        return len(KEYS)
+
+    def __reduce__(self):
+        return (Utterance, (self.speaker, self.utterance, self.function, self.confidence))
+
+    def __repr__(self):
+        return f"Utterance({self.speaker!r}, {self.utterance!r}, {self.function!r}, {self.confidence!r})"
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in KEYS}
+
+
+def as_dicts(utterances):
+    """Returns plain dicts for a list of utterance records (or dicts)."""
+    return [dict(u) for u in utterances]
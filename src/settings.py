@@ -0,0 +1,12 @@
+"""
+Environment switches shared by the pipeline modules.
+
+Example:
+    enabled = env_flag('METRICS')      # on unless METRICS is off, 0 or false
+"""
+import os
+
+
+def env_flag(name, default='on'):
+    """True unless the environment variable (or default, when unset) is off, 0 or false, in any case."""
+    return os.getenv(name, default).lower() not in ('off', '0', 'false')
@@ -1,8 +1,11 @@
 import streamlit as st
-from classify import classify_utterances
-from summarise import generate_summary
-from io import BytesIO
-from reportlab.pdfgen import canvas
+from analytics import build_index
+from diagram import DEFAULT_MAX_NODES, generate_mermaid_diagram
+from incremental import IncrementalClassifier
+from pipeline import DialoguePipeline
+from records import FUNCTIONS, as_dicts
+from summarise import SHORT_DIALOGUE_UTTERANCES, rule_based_summary
+import metrics
 
 # === Page config ===
 st.set_page_config(page_title="Dialogue Classifier & Summariser - Ravindra", layout="wide")
@@ -12,12 +15,24 @@ with st.sidebar:
     st.header("⚙️ Settings")
     show_summary = st.checkbox("Show Summary", value=True)
     show_mermaid = st.checkbox("Show Dialogue Flow (Mermaid)", value=True)
+    show_analytics = st.checkbox("Show Dialogue Analytics", value=False)
     mermaid_direction = st.radio(
         "Mermaid Flow Direction",
         options=["TD (Top-Down)", "LR (Left-Right)"],
         index=0,
         key="mermaid_direction_radio"
     )
+    mermaid_mode = st.selectbox(
+        "Dialogue Flow Detail",
+        options=["Auto", "Flow", "Runs", "Transitions"],
+        index=0,
+        help="Auto shows every utterance for short meetings, then collapses runs, then a speaker/function transition graph.",
+        key="mermaid_mode_select"
+    )
+    mermaid_max_nodes = st.number_input("Max diagram nodes", min_value=10, max_value=2000, value=DEFAULT_MAX_NODES, step=10)
+    pdf_include_table = st.checkbox("Include Classified Utterances in PDF", value=False)
+    show_metrics = st.checkbox("Show Metrics (debug)", value=False, disabled=not metrics.enabled,
+                               help="Per-stage timings and counters for this process. Set METRICS=off to disable collection.")
 
 # === Custom CSS for colors and styling ===
 st.markdown('''
@@ -59,39 +74,20 @@ def render_mermaid(mermaid_code):
         st.info("Install streamlit-mermaid or copy code to Mermaid live editor.")
         st.code(mermaid_code, language="mermaid")
 
-def generate_mermaid_diagram(utterances, direction="TD"):
-    nodes = []
-    edges = []
-    for i, u in enumerate(utterances):
-        node_id = f"U{i}"
-        label = f"{u['speaker']}: {u['function']}"
-        nodes.append(f'{node_id}["{label}"]')
-        if i > 0:
-            edges.append(f"U{i-1} --> U{i}")
-    return f"graph {direction}\n" + "\n".join(nodes + edges)
-
-def generate_pdf(summary_text):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer)
-    c.setFont("Helvetica", 12)
-    width, height = c._pagesize
-    lines = summary_text.split("\n")
-    y = height - 50
-    for line in lines:
-        c.drawString(40, y, line)
-        y -= 20
-        if y < 40:
-            c.showPage()
-            y = height - 50
-    c.save()
-    buffer.seek(0)
-    return buffer
+def is_final_summary(summary, utterances, index):
+    """False for Gemini errors and deadline fallbacks, which should be retried on the next run."""
+    if summary.startswith('[Gemini summarization failed'):
+        return False
+    return len(utterances) <= SHORT_DIALOGUE_UTTERANCES or summary != rule_based_summary(utterances, index)
 
 # === Initialize session state keys if missing ===
-default_keys = ['transcript', 'utterances', 'summary', 'mermaid_diagram', 'clear_flag']
+default_keys = ['transcript', 'utterances', 'index', 'summary', 'mermaid_diagram', 'clear_flag', 'summary_signature']
 for key in default_keys:
     if key not in st.session_state:
-        st.session_state[key] = '' if key != 'utterances' else None
+        st.session_state[key] = None if key in ('utterances', 'index') else ''
+# Per-line classification cache, so resubmitting an edited transcript only classifies changed lines
+if 'classifier' not in st.session_state:
+    st.session_state['classifier'] = IncrementalClassifier()
 # Add a dummy key for file_uploader reset
 if 'file_uploader_key' not in st.session_state:
     st.session_state['file_uploader_key'] = 0
@@ -101,8 +97,10 @@ def clear_all():
     # Clear all input and output session state keys
     st.session_state['transcript'] = ''
     st.session_state['utterances'] = None
+    st.session_state['index'] = None
     st.session_state['summary'] = ''
     st.session_state['mermaid_diagram'] = ''
+    st.session_state['summary_signature'] = ''
     st.session_state['transcript_text_area'] = ''  # Explicitly clear text area
     st.session_state['file_uploader_key'] += 1  # Force file_uploader to reset
     # Set flag to trigger rerun
@@ -144,15 +142,26 @@ if submitted:
 
     if transcript:
         try:
-            utterances = classify_utterances(transcript)
-            summary = generate_summary(transcript)
+            classifier = st.session_state['classifier']
+            utterances = classifier.classify(transcript)
+            pipeline = DialoguePipeline(transcript, utterances=utterances)
+            # Only re-summarise when the labelled utterances actually changed
+            if classifier.signature == st.session_state['summary_signature']:
+                summary = st.session_state['summary']
+            else:
+                summary = pipeline.summary
             mermaid_dir = mermaid_direction.split()[0]  # "TD" or "LR"
-            mermaid_diagram = generate_mermaid_diagram(utterances, direction=mermaid_dir)
+            mermaid_diagram = pipeline.mermaid(generate_mermaid_diagram, direction=mermaid_dir,
+                                               mode=mermaid_mode.lower(), max_nodes=mermaid_max_nodes)
 
             # Update session state only after successful processing
             st.session_state['transcript'] = transcript
             st.session_state['utterances'] = utterances
+            st.session_state['index'] = pipeline.index
             st.session_state['summary'] = summary
+            # Keep a fallback or error only for display, so the next run asks the LLM again
+            st.session_state['summary_signature'] = (
+                classifier.signature if is_final_summary(summary, utterances, pipeline.index) else '')
             st.session_state['mermaid_diagram'] = mermaid_diagram
 
         except Exception as e:
@@ -168,7 +177,8 @@ summary = st.session_state['summary']
 mermaid_diagram = ''
 if utterances is not None:
     mermaid_dir = mermaid_direction.split()[0]  # TD or LR
-    mermaid_diagram = generate_mermaid_diagram(utterances, direction=mermaid_dir)
+    mermaid_diagram = generate_mermaid_diagram(utterances, direction=mermaid_dir,
+                                               mode=mermaid_mode.lower(), max_nodes=mermaid_max_nodes)
     st.session_state['mermaid_diagram'] = mermaid_diagram  # Update session state too
 
 if transcript.strip() and utterances is not None:
@@ -178,16 +188,52 @@ if transcript.strip() and utterances is not None:
     st.code(transcript, language="text")
 
     st.subheader("🧠 Classified Utterances")
-    st.dataframe(utterances, use_container_width=True)
+    st.dataframe(as_dicts(utterances), use_container_width=True)
 
     if show_summary:
         st.subheader("📑 Summary")
         st.markdown(f'<div class="summary-box">{summary}</div>', unsafe_allow_html=True)
-        pdf_buffer = generate_pdf(summary)
-        st.download_button("📥 Download Summary as PDF", data=pdf_buffer, file_name="summary.pdf", mime="application/pdf")
+        # Imported on first use so reportlab is not loaded at startup; memoised per
+        # content hash, so reruns with an unchanged summary do not re-render
+        from pdf_export import pdf_bytes
+        pdf_data = pdf_bytes(summary, utterances if pdf_include_table else None)
+        st.download_button("📥 Download Summary as PDF", data=pdf_data, file_name="summary.pdf", mime="application/pdf")
 
     if show_mermaid:
         st.subheader("🔄 Dialogue Flow")
         render_mermaid(mermaid_diagram)
+
+    if show_analytics:
+        st.subheader("📈 Dialogue Analytics")
+        index = st.session_state['index'] or build_index(utterances)
+        st.markdown("**Turn-taking**")
+        st.dataframe([{'speaker': speaker, **stats} for speaker, stats in index.turn_taking().items()],
+                     use_container_width=True)
+        st.markdown("**Dialogue functions per speaker**")
+        st.dataframe([{'speaker': speaker, **counts} for speaker, counts in index.speaker_function_counts.items()],
+                     use_container_width=True)
+        st.markdown("**Function transitions** (row: previous utterance, column: next)")
+        present = [f for f in FUNCTIONS if index.function_counts[f]]
+        st.dataframe([{'from': a, **{b: index.transition_count(a, b) for b in present}} for a in present],
+                     use_container_width=True)
+        st.markdown("**Adjacency pairs**")
+        pairs = [{'pair': pair.replace('>', ' → '), 'speakers': f"{utterances[i]['speaker']} → {utterances[i + 1]['speaker']}",
+                  'utterance': utterances[i]['utterance'], 'response': utterances[i + 1]['utterance']}
+                 for pair, offsets in sorted(index.pair_offsets.items()) for i in offsets]
+        if pairs:
+            st.dataframe(pairs, use_container_width=True)
+        else:
+            st.info("No adjacency pairs detected.")
 else:
     st.info("Awaiting transcript input. Upload a file or paste text, then click 'Process Transcript'.")
+
+# === Debug metrics ===
+if show_metrics:
+    snapshot = metrics.snapshot()
+    with st.expander("📊 Metrics", expanded=True):
+        st.dataframe([{'stage': stage, **timing} for stage, timing in sorted(snapshot['stages'].items())],
+                     use_container_width=True)
+        st.dataframe([{'counter': name, **dict(labels), 'value': value}
+                      for (name, labels), value in sorted(snapshot['counters'].items())],
+                     use_container_width=True)
+        st.code(metrics.render_prometheus(), language="text")
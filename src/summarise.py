@@ -1,103 +1,264 @@
 import re
+from analytics import build_index
 from classify import classify_utterances
 from collections import Counter, defaultdict
 import os
-import google.generativeai as genai
-import streamlit as st
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from settings import env_flag
+from summary_cache import SummaryCache, cache_key
+
+MODEL_NAME = 'gemini-1.5-flash'
+SHORT_DIALOGUE_UTTERANCES = 8
+PROMPT_TEMPLATE = "Summarize the following team meeting transcript, focusing on key proposals, concerns, decisions, and commitments. Write a concise, natural summary as if for meeting minutes.\n\nTranscript:\n{transcript}\n\nSummary:"
+
+# Hierarchical (map-reduce) summarisation for transcripts too long for one prompt
+MAX_PROMPT_TOKENS = 24000
+CHUNK_TOKENS = 6000
+CHUNK_PROMPT_TEMPLATE = "Summarize this part ({part} of {total}) of a team meeting transcript, focusing on key proposals, concerns, decisions, and commitments. Keep speaker names.\n\nTranscript part:\n{transcript}\n\nPartial summary:"
+MERGE_PROMPT_TEMPLATE = "The following are summaries of consecutive parts of one team meeting. Merge them into a single concise, natural summary as if for meeting minutes, focusing on key proposals, concerns, decisions, and commitments.\n\n{summaries}\n\nSummary:"
+
+# Gemini summaries are cached by transcript content. Set SUMMARY_CACHE=off to disable.
+summary_cache = SummaryCache(
+    os.getenv('SUMMARY_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'summary_cache.sqlite3')),
+    enabled=env_flag('SUMMARY_CACHE'),
+)
 
 # Function to generate a summary of the dialogue transcript
-def generate_summary(transcript):
-    utterances = classify_utterances(transcript)
+def generate_summary(transcript, utterances=None, model=None, hierarchical=None, index=None):
+    """
+    Summarises a transcript. Pass the output of classify_utterances(transcript) as
+    utterances to avoid classifying the transcript a second time, and its
+    analytics.DialogueIndex as index to avoid rebuilding it. model can be any
+    object with a Gemini-style generate_content(prompt) method, e.g. a local stand-in.
+    Long transcripts that exceed MAX_PROMPT_TOKENS are summarised chunk by chunk
+    (see summarise_hierarchical); pass hierarchical=True/False to force a mode.
+    """
+    if utterances is None:
+        utterances = classify_utterances(transcript)
     if not utterances:
         return "No dialogue found."
 
     # For short dialogues, use detailed summary
-    if len(utterances) <= 8:
-        summary = ""
-        i = 0
-        n = len(utterances)
-        while i < n:
-            utt = utterances[i]
-            speaker = utt['speaker']
-            function = utt['function']
-            utterance = utt['utterance'].lower()
-            if i == 0:
-                if function == 'Proposal':
-                    proposal = re.sub(r'^i think we should ', '', utterance, flags=re.IGNORECASE)
-                    proposal = re.sub(r'\bthe\b', 'a', proposal, count=1)
-                    proposal = proposal.strip('.')
-                    summary += f"{speaker} opened with a proposal to {proposal}. "
-                else:
-                    summary += f"{speaker} opened with a {function.lower()}: {utterance}. "
-                i += 1
-                continue
-            next_utt = utterances[i+1] if i+1 < n else None
-            if function == 'Disagreement' and next_utt and next_utt['function'] == 'Justification':
-                summary += f"{speaker} challenged this based on past reliability, but {next_utt['speaker']} responded with a justification"
-                i += 2
-                if i < n and utterances[i]['function'] in ['Question', 'Query']:
-                    summary += f", but {utterances[i]['speaker']} queried the testing status"
-                    i += 1
-                summary += ". "
-                continue
-            if function == 'Justification' and next_utt and next_utt['function'] in ['Question', 'Query']:
-                summary += f"{speaker} responded with a justification, but {next_utt['speaker']} queried the testing status. "
-                i += 2
-                continue
-            if function == 'Deferral' and next_utt and next_utt['function'] == 'Proposal' and ("hold off" in next_utt['utterance'].lower() or "delay" in next_utt['utterance'].lower()):
-                summary += f"{speaker} deferred by explaining the testing timeline. {next_utt['speaker']} then suggested delaying action"
-                i += 2
-                if i < n and utterances[i]['function'] == 'Commitment':
-                    summary += f", and {utterances[i]['speaker']} committed to providing an update"
-                    i += 1
-                summary += ". "
-                continue
-            if function == 'Proposal' and ("hold off" in utterance or "delay" in utterance) and next_utt and next_utt['function'] == 'Commitment':
-                summary += f"{speaker} suggested delaying action, and {next_utt['speaker']} committed to providing an update. "
-                i += 2
-                continue
-            if function == 'Challenge':
-                summary += f"{speaker} challenged this based on past reliability. "
-            elif function == 'Justification':
-                summary += f"{speaker} responded with a justification. "
-            elif function == 'Question' or function == 'Query':
-                summary += f"{speaker} queried the testing status. "
-            elif function == 'Deferral':
-                summary += f"{speaker} deferred by explaining the testing timeline. "
-            elif function == 'Proposal':
-                if "hold off" in utterance or "delay" in utterance:
-                    summary += f"{speaker} suggested delaying action. "
-                else:
-                    summary += f"{speaker} proposed a new idea. "
-            elif function == 'Commitment':
-                summary += f"{speaker} committed to providing an update. "
-            elif function == 'Agreement':
-                summary += f"{speaker} agreed. "
-            elif function == 'Disagreement':
-                summary += f"{speaker} disagreed. "
+    if len(utterances) <= SHORT_DIALOGUE_UTTERANCES:
+        return rule_based_summary(utterances, index)
+
+    # For long dialogues, use Google Gemini LLM for summarization
+    if hierarchical is None:
+        hierarchical = estimate_tokens(transcript) > MAX_PROMPT_TOKENS
+    prompt_template = CHUNK_PROMPT_TEMPLATE + MERGE_PROMPT_TEMPLATE if hierarchical else PROMPT_TEMPLATE
+    model_name = getattr(model, 'model_name', MODEL_NAME)
+    key = cache_key(transcript, prompt_template, model_name)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return cached
+    if model is None:
+        model = get_model()
+        if model is None:
+            return "[Gemini summarization failed: GOOGLE_API_KEY environment variable not set.]"
+    try:
+        if hierarchical:
+            summary = summarise_hierarchical(utterances, model)
+        else:
+            summary = generate_text(model, PROMPT_TEMPLATE.format(transcript=transcript))
+        summary_cache.set(key, summary)
+        return summary
+    except Exception as e:
+        return f"[Gemini summarization failed: {e}]"
+
+def rule_based_summary(utterances, index=None):
+    """
+    Narrative summary built from the dialogue functions alone. Used for short
+    dialogues, and as the fallback when an LLM summary is not available in time.
+    Adjacency pairs are read from index (an analytics.DialogueIndex of the same
+    utterances), which is built here if not given.
+    """
+    if index is None:
+        index = build_index(utterances)
+    summary = ""
+    i = 0
+    n = len(utterances)
+    while i < n:
+        utt = utterances[i]
+        speaker = utt['speaker']
+        function = utt['function']
+        utterance = utt['utterance'].lower()
+        if i == 0:
+            if function == 'Proposal':
+                proposal = re.sub(r'^i think we should ', '', utterance, flags=re.IGNORECASE)
+                proposal = re.sub(r'\bthe\b', 'a', proposal, count=1)
+                proposal = proposal.strip('.')
+                summary += f"{speaker} opened with a proposal to {proposal}. "
             else:
-                summary += f"{speaker} responded. "
+                summary += f"{speaker} opened with a {function.lower()}: {utterance}. "
             i += 1
-        return summary.strip()
+            continue
+        next_utt = utterances[i+1] if i+1 < n else None
+        if index.has_pair(i, 'Disagreement', 'Justification'):
+            summary += f"{speaker} challenged this based on past reliability, but {next_utt['speaker']} responded with a justification"
+            i += 2
+            if index.has_pair(i - 1, 'Justification', 'Question') or index.has_pair(i - 1, 'Justification', 'Query'):
+                summary += f", but {utterances[i]['speaker']} queried the testing status"
+                i += 1
+            summary += ". "
+            continue
+        if index.has_pair(i, 'Justification', 'Question') or index.has_pair(i, 'Justification', 'Query'):
+            summary += f"{speaker} responded with a justification, but {next_utt['speaker']} queried the testing status. "
+            i += 2
+            continue
+        if index.has_pair(i, 'Deferral', 'Proposal') and ("hold off" in next_utt['utterance'].lower() or "delay" in next_utt['utterance'].lower()):
+            summary += f"{speaker} deferred by explaining the testing timeline. {next_utt['speaker']} then suggested delaying action"
+            i += 2
+            if index.has_pair(i - 1, 'Proposal', 'Commitment'):
+                summary += f", and {utterances[i]['speaker']} committed to providing an update"
+                i += 1
+            summary += ". "
+            continue
+        if index.has_pair(i, 'Proposal', 'Commitment') and ("hold off" in utterance or "delay" in utterance):
+            summary += f"{speaker} suggested delaying action, and {next_utt['speaker']} committed to providing an update. "
+            i += 2
+            continue
+        if function == 'Challenge':
+            summary += f"{speaker} challenged this based on past reliability. "
+        elif function == 'Justification':
+            summary += f"{speaker} responded with a justification. "
+        elif function == 'Question' or function == 'Query':
+            summary += f"{speaker} queried the testing status. "
+        elif function == 'Deferral':
+            summary += f"{speaker} deferred by explaining the testing timeline. "
+        elif function == 'Proposal':
+            if "hold off" in utterance or "delay" in utterance:
+                summary += f"{speaker} suggested delaying action. "
+            else:
+                summary += f"{speaker} proposed a new idea. "
+        elif function == 'Commitment':
+            summary += f"{speaker} committed to providing an update. "
+        elif function == 'Agreement':
+            summary += f"{speaker} agreed. "
+        elif function == 'Disagreement':
+            summary += f"{speaker} disagreed. "
+        else:
+            summary += f"{speaker} responded. "
+        i += 1
+    return summary.strip()
 
-    # For long dialogues, use Google Gemini LLM for summarization
+def get_api_key():
     api_key = os.getenv('GOOGLE_API_KEY')
     if not api_key:
+        # Only use st.secrets if running under Streamlit, which has imported it already;
+        # importing it here would load all of streamlit into every Flask, CLI and batch process
+        st = sys.modules.get('streamlit')
         try:
-            import streamlit as st
-            # Only use st.secrets if running under Streamlit (Check if running in Streamlit context)
-            if hasattr(st, '_is_running_with_streamlit') and st._is_running_with_streamlit:
+            if st is not None and getattr(st, '_is_running_with_streamlit', False):
                 api_key = st.secrets["GOOGLE_API_KEY"]
         except Exception:
             pass
-    if not api_key:
-        return "[Gemini summarization failed: GOOGLE_API_KEY environment variable not set.]"
-    genai.configure(api_key=api_key)
-    prompt = f"Summarize the following team meeting transcript, focusing on key proposals, concerns, decisions, and commitments. Write a concise, natural summary as if for meeting minutes.\n\nTranscript:\n{transcript}\n\nSummary:"
+    return api_key
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Returns the shared Gemini model, configuring the client on first use only.
+    Returns None if no API key is available.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                api_key = get_api_key()
+                if not api_key:
+                    return None
+                # Imported here so rule-based callers never pay for loading the SDK
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+def chunk_utterances(utterances, max_tokens=CHUNK_TOKENS):
+    """
+    Splits classified utterances into transcript chunks of at most max_tokens
+    (estimated), breaking only where the speaker changes. A single turn longer
+    than the budget is split between its utterances.
+    Returns a list of transcript strings.
+    """
+    # Group consecutive utterances by the same speaker into turns
+    turns = []
+    for u in utterances:
+        line = f"{u['speaker']}: {u['utterance']}"
+        if turns and turns[-1][0] == u['speaker']:
+            turns[-1][1].append(line)
+        else:
+            turns.append((u['speaker'], [line]))
+    chunks = []
+    current = []
+    current_tokens = 0
+    for _, lines in turns:
+        turn_tokens = sum(estimate_tokens(line) for line in lines)
+        if current and current_tokens + turn_tokens > max_tokens:
+            chunks.append('\n'.join(current))
+            current, current_tokens = [], 0
+        for line in lines:
+            line_tokens = estimate_tokens(line)
+            if current and current_tokens + line_tokens > max_tokens:
+                chunks.append('\n'.join(current))
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += line_tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+def generate_text(model, prompt):
+    """Calls model.generate_content once, recording its latency and token counts."""
+    start = time.perf_counter()
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
-        summary = response.text.strip()
-        return summary
-    except Exception as e:
-        return f"[Gemini summarization failed: {e}]"
+        text = model.generate_content(prompt).text.strip()
+    except Exception:
+        metrics.record_llm(time.perf_counter() - start, prompt, error=True)
+        raise
+    metrics.record_llm(time.perf_counter() - start, prompt, text)
+    return text
+
+def generate_with_retry(model, prompt, retries=3, backoff=1.0):
+    """Calls model.generate_content, retrying with exponential backoff and jitter."""
+    for attempt in range(retries + 1):
+        try:
+            return generate_text(model, prompt)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+def summarise_hierarchical(utterances, model, max_tokens=CHUNK_TOKENS, max_workers=4, retries=3, backoff=1.0):
+    """
+    Map-reduce summary: each chunk from chunk_utterances is summarised concurrently
+    (at most max_workers calls in flight, each retried on its own), then the
+    partial summaries are merged in a final call. Merging recurses if the partial
+    summaries themselves exceed the chunk budget.
+    """
+    chunks = chunk_utterances(utterances, max_tokens)
+    if len(chunks) == 1:
+        return generate_with_retry(model, PROMPT_TEMPLATE.format(transcript=chunks[0]), retries, backoff)
+    prompts = [CHUNK_PROMPT_TEMPLATE.format(part=i + 1, total=len(chunks), transcript=chunk)
+               for i, chunk in enumerate(chunks)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        partials = list(pool.map(lambda prompt: generate_with_retry(model, prompt, retries, backoff), prompts))
+    while True:
+        summaries = '\n\n'.join(f"Part {i + 1}:\n{partial}" for i, partial in enumerate(partials))
+        if estimate_tokens(summaries) <= max_tokens or len(partials) <= 2:
+            return generate_with_retry(model, MERGE_PROMPT_TEMPLATE.format(summaries=summaries), retries, backoff)
+        # Merge neighbouring partial summaries pairwise until they fit one prompt
+        groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+        merge_prompts = [MERGE_PROMPT_TEMPLATE.format(summaries='\n\n'.join(group)) for group in groups]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            partials = list(pool.map(lambda prompt: generate_with_retry(model, prompt, retries, backoff), merge_prompts))
@@ -0,0 +1,136 @@
+"""
+Content-addressed cache for LLM summaries.
+
+Entries are keyed by a hash of the model name, prompt template and normalised
+transcript, so re-submitting the same meeting (or a Streamlit rerun) never pays
+for a second Gemini call. Lookups go to an in-memory LRU first and then to an
+on-disk SQLite table (skipped when path is None); both tiers honour the TTL and
+a maximum entry count. If the database cannot be opened or written (OSError or
+sqlite3.Error), the cache carries on in memory only.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalise_transcript(transcript):
+    """Collapses whitespace and drops blank lines, so cosmetic edits share a cache entry."""
+    lines = (' '.join(line.split()) for line in transcript.strip().splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def cache_key(transcript, prompt, model_name):
+    digest = hashlib.sha256()
+    for part in (model_name, prompt, normalise_transcript(transcript)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, path=None, enabled=True, ttl=7 * 24 * 3600, max_memory_entries=256, max_disk_entries=10000):
+        self.path = path
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    def get(self, key):
+        """Returns the cached summary for key, or None."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._memory.pop(key, None)
+            try:
+                db = self._connect()
+                row = db and db.execute('SELECT summary, created FROM summaries WHERE key = ?', (key,)).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    db.execute('UPDATE summaries SET accessed = ? WHERE key = ?', (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+            except (OSError, sqlite3.Error):
+                self._disable_disk()
+            self.misses += 1
+            return None
+
+    def set(self, key, summary):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, summary, now)
+            try:
+                db = self._connect()
+                if db is not None:
+                    db.execute('INSERT OR REPLACE INTO summaries (key, summary, created, accessed) VALUES (?, ?, ?, ?)',
+                               (key, summary, now, now))
+                    self._evict(db, now)
+                    db.commit()
+            except (OSError, sqlite3.Error):
+                self._disable_disk()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'memory_entries': len(self._memory)}
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            try:
+                db = self._connect()
+                if db is not None:
+                    db.execute('DELETE FROM summaries')
+                    db.commit()
+            except (OSError, sqlite3.Error):
+                self._disable_disk()
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remember(self, key, summary, created):
+        self._memory[key] = (summary, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, db, now):
+        if self.ttl is not None:
+            db.execute('DELETE FROM summaries WHERE created < ?', (now - self.ttl,))
+        if self.max_disk_entries:
+            db.execute('DELETE FROM summaries WHERE key NOT IN '
+                       '(SELECT key FROM summaries ORDER BY accessed DESC LIMIT ?)', (self.max_disk_entries,))
+
+    def _disable_disk(self):
+        """Drops the SQLite tier after an error; the in-memory LRU keeps working."""
+        if self._db is not None:
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+        self._db = None
+        self.path = None
+
+    def _connect(self):
+        if self.path is None:
+            return None
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS summaries '
+                             '(key TEXT PRIMARY KEY, summary TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)')
+            self._db.commit()
+        return self._db
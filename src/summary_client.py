@@ -0,0 +1,143 @@
+"""
+Long-lived, deadline-bounded summarisation client.
+
+One SummaryClient per process owns the configured Gemini model and an event loop
+thread, and every request runs on that loop, whichever thread or loop it comes
+from. Every request gets a deadline; at most max_concurrency LLM calls are in
+flight, and identical concurrent requests share one upstream call. When the
+deadline passes the caller gets the rule-based summary instead of waiting.
+
+Example:
+    client = get_client()
+    summary = client.summarise(transcript, utterances)           # from sync code
+    summary = await client.summarise_async(transcript, utterances)  # from async code
+"""
+import asyncio
+import os
+import threading
+import time
+
+import metrics
+from classify import classify_utterances
+from summary_cache import cache_key
+import summarise
+
+
+async def _in_thread(fn, *args):
+    """Runs a blocking call (LLM request, SQLite lookup) off the event loop thread."""
+    # asyncio.to_thread would need Python 3.9
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+class SummaryClient:
+    def __init__(self, model=None, timeout=30.0, max_concurrency=4):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.timeouts = 0
+        self.coalesced = 0
+        self._model = model
+        self._inflight = {}
+        self._semaphore = None
+        self._loop = None
+        self._lock = threading.Lock()
+
+    async def summarise_async(self, transcript, utterances=None, timeout=None, index=None):
+        """
+        Returns the summary for transcript, or the rule-based summary if the LLM
+        does not answer within timeout seconds (default: self.timeout). index is
+        the utterances' analytics.DialogueIndex, built for the rule-based summary if not given.
+        """
+        loop = self._ensure_loop()
+        coro = self._summarise(transcript, utterances, timeout, index)
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        # The semaphore and in-flight tasks belong to the client's loop, so callers
+        # on any other loop (e.g. successive asyncio.run() calls) hand the work over
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def summarise(self, transcript, utterances=None, timeout=None, index=None):
+        """Blocking wrapper around summarise_async for Flask and Streamlit code."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._summarise(transcript, utterances, timeout, index), self._ensure_loop())
+        return future.result()
+
+    async def _summarise(self, transcript, utterances, timeout, index):
+        if utterances is None:
+            utterances = classify_utterances(transcript)
+        if not utterances:
+            return "No dialogue found."
+        if len(utterances) <= summarise.SHORT_DIALOGUE_UTTERANCES:
+            return summarise.rule_based_summary(utterances, index)
+
+        hierarchical = summarise.estimate_tokens(transcript) > summarise.MAX_PROMPT_TOKENS
+        model = self._model or summarise.get_model()
+        if model is None:
+            return "[Gemini summarization failed: GOOGLE_API_KEY environment variable not set.]"
+        prompt_template = summarise.CHUNK_PROMPT_TEMPLATE + summarise.MERGE_PROMPT_TEMPLATE if hierarchical else summarise.PROMPT_TEMPLATE
+        key = cache_key(transcript, prompt_template, getattr(model, 'model_name', summarise.MODEL_NAME))
+        cached = await _in_thread(summarise.summary_cache.get, key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(model, key, transcript, utterances, hierarchical))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        try:
+            # shield() keeps the shared upstream call alive for other waiters and the cache
+            return await asyncio.wait_for(asyncio.shield(task), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            metrics.inc('summary_timeouts_total')
+            return summarise.rule_based_summary(utterances, index)
+        except Exception as e:
+            return f"[Gemini summarization failed: {e}]"
+
+    async def _call(self, model, key, transcript, utterances, hierarchical):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            if hierarchical:
+                summary = await _in_thread(summarise.summarise_hierarchical, utterances, model)
+            else:
+                prompt = summarise.PROMPT_TEMPLATE.format(transcript=transcript)
+                if hasattr(model, 'generate_content_async'):
+                    start = time.perf_counter()
+                    try:
+                        response = await model.generate_content_async(prompt)
+                    except Exception:
+                        metrics.record_llm(time.perf_counter() - start, prompt, error=True)
+                        raise
+                    summary = response.text.strip()
+                    metrics.record_llm(time.perf_counter() - start, prompt, summary)
+                else:
+                    summary = await _in_thread(summarise.generate_text, model, prompt)
+        await _in_thread(summarise.summary_cache.set, key, summary)
+        return summary
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='summary-client', daemon=True).start()
+            return self._loop
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide client. SUMMARY_TIMEOUT sets the deadline in seconds."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SummaryClient(
+                    timeout=float(os.getenv('SUMMARY_TIMEOUT', '30')),
+                    max_concurrency=int(os.getenv('SUMMARY_MAX_CONCURRENCY', '4')),
+                )
+    return _client
@@ -0,0 +1,138 @@
+"""Tests for the statistical classifier backends and their use in classify (run with pytest from src/)."""
+import os
+
+import pytest
+
+import backends
+import classify
+from records import Utterance
+
+
+class StubBackend(backends.Backend):
+    """Labels every text from a fixed table and records the batches it is given."""
+    name = 'stub'
+
+    def __init__(self, predictions, threshold=0.5):
+        super().__init__()
+        self.predictions = predictions
+        self.threshold = threshold
+        self.batches = []
+
+    def predict(self, texts):
+        self.batches.append(list(texts))
+        return [self.predictions[text] for text in texts]
+
+
+@pytest.fixture
+def use_backend():
+    def install(backend):
+        backends.set_backend(backend)
+        return backend
+    yield install
+    backends.set_backend(None)
+
+
+@pytest.fixture(scope='module')
+def small_model():
+    texts = ["i'll send the notes", "i will do it", "thanks a lot", "thank you so much", "sorry about that"]
+    labels = ['Commitment', 'Commitment', 'Thanking', 'Thanking', 'Apology']
+    return backends.HashedNgramModel(n_features=2 ** 10, threshold=0.4).fit(texts, labels, epochs=10)
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        backends.Backend()
+
+
+def test_ngram_model_round_trips_through_save_and_load(small_model, tmp_path):
+    path = str(tmp_path / 'model.npz')
+    small_model.save(path)
+    loaded = backends.HashedNgramModel.load(path)
+    assert loaded.threshold == pytest.approx(0.4)
+    assert (loaded.weights == small_model.weights).all()
+    assert (loaded.bias == small_model.bias).all()
+    texts = ["I’ll send it over", "thanks!", "no idea"]
+    assert loaded.predict(texts) == small_model.predict(texts)
+    assert os.listdir(tmp_path) == ['model.npz']
+
+
+def test_failed_save_leaves_no_partial_file(small_model, tmp_path):
+    # A directory in the way makes the final rename fail
+    (tmp_path / 'model.npz').mkdir()
+    with pytest.raises(OSError):
+        small_model.save(str(tmp_path / 'model.npz'))
+    assert os.listdir(tmp_path) == ['model.npz']
+
+
+def test_model_without_a_threshold_is_rejected(small_model, tmp_path):
+    path = str(tmp_path / 'old.npz')
+    small_model._np.savez_compressed(path, weights=small_model.weights, bias=small_model.bias,
+                                     functions=small_model._np.array(backends.FUNCTIONS))
+    with pytest.raises(ValueError):
+        backends.HashedNgramModel.load(path)
+
+
+def test_typographic_apostrophes_share_features():
+    assert backends.ngram_features("I’ll do it", 1024) == backends.ngram_features("I'll do it", 1024)
+
+
+@pytest.mark.parametrize('prediction, threshold, expected', [
+    (('Commitment', 0.8), 0.5, ('Commitment', 0.8)),
+    (('Commitment', 0.5), 0.5, ('Commitment', 0.5)),
+    (('Commitment', 0.3), 0.5, ('Statement', 0.7)),
+    (('Statement', 0.9), 0.5, ('Statement', 0.9)),
+    (('Proposal', 0.99), float('inf'), ('Statement', pytest.approx(0.01))),
+])
+def test_decide(prediction, threshold, expected):
+    assert classify._decide(*prediction, threshold) == expected
+
+
+def test_apply_backend_relabels_only_defaults_in_one_ordered_batch(use_backend):
+    backend = use_backend(StubBackend({
+        'first default': ('Commitment', 0.9),
+        'second default': ('Proposal', 0.2),
+        'third default': ('Request', 0.7),
+    }))
+    records = [
+        Utterance('A', 'first default', 'Statement'),
+        Utterance('B', 'Thanks a lot.', 'Thanking'),
+        Utterance('A', 'second default', 'Statement'),
+        Utterance('B', 'already relabelled', 'Statement', 0.6),
+        Utterance('A', '', 'Statement'),
+        Utterance('B', 'third default', 'Statement'),
+    ]
+    assert classify.apply_backend(records) is records
+    assert backend.batches == [['first default', 'second default', 'third default']]
+    assert [(r.function, r.confidence) for r in records] == [
+        ('Commitment', 0.9), ('Thanking', 1.0), ('Statement', pytest.approx(0.8)),
+        ('Statement', 0.6), ('Statement', 1.0), ('Request', 0.7),
+    ]
+
+
+def test_model_threshold_overrides_the_backend(use_backend, monkeypatch):
+    use_backend(StubBackend({'maybe': ('Proposal', 0.6)}, threshold=0.5))
+    monkeypatch.setattr(backends, 'MODEL_THRESHOLD', 0.9)
+    assert classify.classify_function_with_confidence('maybe') == ('Statement', pytest.approx(0.4))
+    monkeypatch.setattr(backends, 'MODEL_THRESHOLD', None)
+    assert classify.classify_function_with_confidence('maybe') == ('Proposal', 0.6)
+
+
+def test_calibrated_threshold_meets_the_precision_target():
+    records = [{'utterance': text, 'function': function} for text, function in (
+        ('a', 'Commitment'), ('b', 'Commitment'), ('c', 'Request'), ('d', 'Proposal'), ('e', 'Statement'))]
+    model = StubBackend({
+        'a': ('Commitment', 0.9), 'b': ('Commitment', 0.8), 'c': ('Greeting', 0.7),
+        'd': ('Proposal', 0.6), 'e': ('Agreement', 0.3),
+    })
+    # 3 of the top 4 are right: 75%
+    assert backends.calibrate_threshold(model, records, min_precision=0.75) == 0.6
+    assert backends.calibrate_threshold(model, records, min_precision=0.9) == 0.8
+    assert backends.calibrate_threshold(model, records[2:3], min_precision=0.9) == float('inf')
+
+
+def test_single_line_is_relabelled_like_a_batch(use_backend):
+    use_backend(StubBackend({'first default': ('Commitment', 0.9)}))
+    record = classify.classify_line('Alice:  first default ')
+    assert (record.speaker, record.utterance, record.function, record.confidence) == ('Alice', 'first default', 'Commitment', 0.9)
+    assert classify.classify_line('Bob: Thanks a lot.').function == 'Thanking'
+    assert classify.classify_line('no speaker here') is None
@@ -0,0 +1,24 @@
+"""Tests for batch.classify_batch (run with pytest from src/)."""
+import pathlib
+
+import pytest
+
+from batch import classify_batch
+
+
+def test_strings_are_transcripts_unless_paths_are_requested(tmp_path):
+    path = tmp_path / 'meeting.txt'
+    path.write_text("Alice: Thanks for joining.\nBob: Can you send the notes?\n", encoding='utf-8')
+    results = dict(classify_batch(["Alice: Hello everyone.", str(path), path], processes=1))
+    assert [u['function'] for u in results[0]] == ['Greeting']
+    # The path string is classified as text: it is not an utterance line, so nothing comes back
+    assert results[1] == []
+    assert [u['function'] for u in results[str(path)]] == ['Thanking', 'Request']
+    assert dict(classify_batch([str(path)], processes=1, paths=True)) == {str(path): results[str(path)]}
+
+
+def test_missing_path_raises():
+    with pytest.raises(FileNotFoundError):
+        list(classify_batch(['no/such/meeting.txt'], processes=1, paths=True))
+    with pytest.raises(FileNotFoundError):
+        list(classify_batch([pathlib.Path('no/such/meeting.txt')], processes=1))
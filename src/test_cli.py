@@ -0,0 +1,44 @@
+"""Tests for the cli batch tool (run with pytest from src/)."""
+import json
+
+import pytest
+
+import cli
+
+
+@pytest.fixture
+def archive(tmp_path):
+    directory = tmp_path / 'transcripts'
+    directory.mkdir()
+    (directory / 'a.txt').write_text("Alice: Hello everyone.\nBob: Thanks for joining.\n", encoding='utf-8')
+    # Latin-1, not UTF-8: '\xe9' on its own is an invalid byte
+    (directory / 'b.txt').write_bytes(b"Alice: The caf\xe9 plan is ready.\nBob: I agree.\n")
+    (directory / 'c.txt').write_text("Carol: Can you send the notes?\n", encoding='utf-8')
+    return directory
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize('processes', ['1', '2'])
+def test_mixed_encoding_archive_is_classified_and_checkpointed(archive, tmp_path, processes):
+    output = str(tmp_path / 'out.jsonl')
+    assert cli.main(['classify', str(archive), '-o', output, '--processes', processes]) == 0
+    rows = read_jsonl(output)
+    sources = {row['source'] for row in rows}
+    assert sources == {str(archive / name) for name in ('a.txt', 'b.txt', 'c.txt')}
+    assert any('�' in row['utterance'] for row in rows)
+    with open(output + '.manifest.json', encoding='utf-8') as f:
+        assert len(json.load(f)['files']) == 3
+    # A rerun finds everything done and keeps the output
+    assert cli.main(['classify', str(archive), '-o', output, '--processes', processes]) == 0
+    assert read_jsonl(output) == rows
+
+
+def test_other_output_suffixes_are_rejected(archive, tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main(['classify', str(archive), '-o', str(tmp_path / 'out.csv')])
+    assert cli.infer_format(str(tmp_path / 'out')) == 'parquet'
+    assert cli.infer_format(None) == 'jsonl'
@@ -0,0 +1,23 @@
+"""Tests for the Flask JSON API (run with pytest from src/)."""
+import pytest
+
+import main
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize('endpoint', ['/api/classify', '/api/summarise'])
+@pytest.mark.parametrize('body', ['[1, 2]', '"Alice: Hello."', 'null', '{"transcript": 5}', '{not json'])
+def test_json_bodies_without_a_transcript_string_are_rejected(client, endpoint, body):
+    response = client.post(endpoint, data=body, content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "No transcript provided."}
+
+
+def test_classify_accepts_a_json_object(client):
+    response = client.post('/api/classify', json={'transcript': "Alice: Hello everyone.\nBob: Thanks."})
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 2
@@ -0,0 +1,117 @@
+"""Tests for hierarchical (map-reduce) summarisation with offline stand-in models (run with pytest from src/)."""
+import functools
+import sys
+import threading
+
+import pytest
+
+import summarise
+from benchmark import FakeModel, _FakeResponse, build_transcript
+from records import Utterance
+from summary_cache import SummaryCache
+
+
+class ScriptedModel(FakeModel):
+    """
+    FakeModel that fails the first call for each prompt containing one of fail_once,
+    and answers every other call with reply(prompt). Prompts are recorded in call order.
+    """
+    def __init__(self, fail_once=(), reply=None, latency=0.0):
+        super().__init__(latency=latency)
+        self.fail_once = set(fail_once)
+        self.reply = reply or (lambda prompt: f"summary {len(prompt)}")
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.prompts.append(prompt)
+            marker = next((m for m in self.fail_once if m in prompt), None)
+            self.fail_once.discard(marker)
+        if marker is not None:
+            raise RuntimeError("simulated upstream error")
+        return _FakeResponse(self.reply(prompt))
+
+
+def utterances_for(turns):
+    """[(speaker, number of lines)] -> Utterance records, one 40-character line each."""
+    records = []
+    for speaker, lines in turns:
+        for _ in range(lines):
+            records.append(Utterance(speaker, f"Line {len(records):04d} of the meeting discussion.", 'Statement'))
+    return records
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setattr(summarise, 'summary_cache', cache)
+    return cache
+
+
+def test_chunks_break_only_between_speakers():
+    utterances = utterances_for([('Alice', 3), ('Bob', 2), ('Alice', 4), ('Carol', 1), ('Bob', 3)])
+    line_tokens = summarise.estimate_tokens("Alice: " + utterances[0]['utterance'])
+    chunks = summarise.chunk_utterances(utterances, max_tokens=5 * line_tokens)
+    lines = [chunk.split('\n') for chunk in chunks]
+    assert [line for chunk in lines for line in chunk] == [f"{u['speaker']}: {u['utterance']}" for u in utterances]
+    assert len(chunks) > 1
+    for before, after in zip(lines, lines[1:]):
+        assert before[-1].split(':')[0] != after[0].split(':')[0]
+    assert all(sum(summarise.estimate_tokens(line) for line in chunk) <= 5 * line_tokens for chunk in lines)
+
+
+def test_turn_longer_than_the_budget_is_split():
+    utterances = utterances_for([('Alice', 1), ('Bob', 12), ('Alice', 1)])
+    line_tokens = summarise.estimate_tokens("Bob: " + utterances[0]['utterance'])
+    chunks = summarise.chunk_utterances(utterances, max_tokens=4 * line_tokens)
+    bob_chunks = [chunk for chunk in chunks if chunk.startswith('Bob:')]
+    assert len(bob_chunks) >= 3
+    assert sum(chunk.count('\n') + 1 for chunk in chunks) == 14
+
+
+def test_failed_chunk_is_retried_on_its_own():
+    utterances = utterances_for([('Alice', 4), ('Bob', 4), ('Carol', 4), ('Dave', 4)])
+    model = ScriptedModel(fail_once=['(2 of 4)'])
+    max_tokens = summarise.estimate_tokens("Alice: " + utterances[0]['utterance']) * 4
+    summary = summarise.summarise_hierarchical(utterances, model, max_tokens=max_tokens, backoff=0)
+    assert summary.startswith('summary')
+    chunk_prompts = [p for p in model.prompts if p.startswith("Summarize this part")]
+    assert sum('(2 of 4)' in p for p in chunk_prompts) == 2
+    assert all(sum(f'({i} of 4)' in p for p in chunk_prompts) == 1 for i in (1, 3, 4))
+    assert model.calls == 4 + 1 + 1    # four chunks, one retry, one merge
+
+
+def test_many_partials_are_merged_pairwise_until_one_prompt():
+    utterances = utterances_for([(f"S{i}", 2) for i in range(8)])
+    line_tokens = summarise.estimate_tokens("S0: " + utterances[0]['utterance'])
+    max_tokens = 2 * line_tokens
+    # Every answer is about 60% of the budget, so only two partials fit a merge prompt
+    model = ScriptedModel(reply=lambda prompt: "x" * (max_tokens * 4 * 6 // 10))
+    summarise.summarise_hierarchical(utterances, model, max_tokens=max_tokens, backoff=0)
+    merges = [p for p in model.prompts if p.startswith("The following are summaries")]
+    assert len(model.prompts) - len(merges) == 8
+    # 8 partials -> 4 -> 2, then the final merge
+    assert len(merges) == 4 + 2 + 1
+    assert model.prompts[-1] in merges
+
+
+def test_error_outlasting_retries_is_reported_and_not_cached(monkeypatch):
+    monkeypatch.setattr(summarise, 'summarise_hierarchical',
+                        functools.partial(summarise.summarise_hierarchical, backoff=0))
+    transcript = build_transcript(40)
+    failing = FakeModel(latency=0.001, error_rate=1.0)
+    summary = summarise.generate_summary(transcript, model=failing, hierarchical=True)
+    assert summary.startswith('[Gemini summarization failed')
+    assert failing.calls == 4    # one chunk, tried 1 + 3 times
+    model = FakeModel(latency=0)
+    assert not summarise.generate_summary(transcript, model=model, hierarchical=True).startswith('[')
+    assert model.calls == 1
+
+
+def test_api_key_lookup_does_not_import_streamlit(monkeypatch):
+    monkeypatch.delenv('GOOGLE_API_KEY', raising=False)
+    monkeypatch.delitem(sys.modules, 'streamlit', raising=False)
+    assert summarise.get_api_key() is None
+    assert 'streamlit' not in sys.modules
@@ -0,0 +1,97 @@
+"""Tests for summary_cache and the cached path of summarise.generate_summary (run with pytest from src/)."""
+import os
+
+import pytest
+
+import summarise
+import summary_cache
+from benchmark import FakeModel, build_transcript
+from summary_cache import SummaryCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setattr(summarise, 'summary_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(summary_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_second_call_is_a_cache_hit(cache):
+    transcript = build_transcript(40)
+    model = FakeModel(latency=0)
+    first = summarise.generate_summary(transcript, model=model)
+    second = summarise.generate_summary(transcript, model=model)
+    assert first == second
+    assert model.calls == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_cosmetic_whitespace_shares_an_entry(cache):
+    transcript = build_transcript(40)
+    model = FakeModel(latency=0)
+    summarise.generate_summary(transcript, model=model)
+    summarise.generate_summary('\n\n' + transcript.replace(': ', ':   ') + '\n', model=model)
+    assert model.calls == 1
+
+
+def test_failed_calls_are_not_cached(cache):
+    transcript = build_transcript(40)
+    failed = summarise.generate_summary(transcript, model=FakeModel(latency=0, error_rate=1.0))
+    assert failed.startswith('[Gemini summarization failed')
+    model = FakeModel(latency=0)
+    summary = summarise.generate_summary(transcript, model=model)
+    assert model.calls == 1
+    assert summary != failed
+
+
+def test_entry_expires_after_ttl(tmp_path, clock):
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite3'), ttl=60)
+    cache.set('k', 'summary')
+    clock[0] += 59
+    assert cache.get('k') == 'summary'
+    clock[0] += 2
+    assert cache.get('k') is None
+    # The disk tier honours the TTL too
+    assert SummaryCache(cache.path, ttl=60).get('k') is None
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = SummaryCache(None, max_memory_entries=2)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'
+    cache.set('c', 'C')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.get('c') == 'C'
+
+
+def test_disk_tier_evicts_least_recently_accessed(tmp_path, clock):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SummaryCache(path, max_memory_entries=1, max_disk_entries=2)
+    for key in ('a', 'b'):
+        cache.set(key, key.upper())
+        clock[0] += 1
+    assert cache.get('a') == 'A'   # read from disk, which refreshes its access time
+    clock[0] += 1
+    cache.set('c', 'C')
+    reopened = SummaryCache(path)
+    assert reopened.get('b') is None
+    assert reopened.get('a') == 'A'
+    assert reopened.get('c') == 'C'
+
+
+def test_unwritable_path_falls_back_to_memory(tmp_path):
+    cache = SummaryCache(os.path.join(str(tmp_path), 'missing', 'cache.sqlite3'))
+    cache.set('k', 'summary')
+    assert cache.get('k') == 'summary'
+    assert cache.get('other') is None
+    assert cache.path is None
+    cache.clear()
@@ -0,0 +1,177 @@
+"""Tests for summary_client.SummaryClient with an offline stand-in model (run with pytest from src/)."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import summarise
+from benchmark import FakeModel, build_transcript
+from classify import classify_utterances
+from summary_cache import SummaryCache
+from summary_client import SummaryClient
+
+
+class AsyncFakeModel(FakeModel):
+    """FakeModel with the generate_content_async method of genai.GenerativeModel."""
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return _Response(f"async summary {self.calls}")
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+def wait_for_background_calls(client, timeout=5):
+    deadline = time.monotonic() + timeout
+    while client._inflight and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    cache = SummaryCache(str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setattr(summarise, 'summary_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def transcript():
+    return build_transcript(40)
+
+
+def test_summary_comes_from_the_model_and_is_cached(transcript):
+    model = FakeModel(latency=0)
+    client = SummaryClient(model=model)
+    first = client.summarise(transcript)
+    second = client.summarise(transcript)
+    assert first == second
+    assert first.startswith('Summary of')
+    assert model.calls == 1
+
+
+def test_async_model_method_is_used(transcript):
+    model = AsyncFakeModel(latency=0)
+    summary = asyncio.run(SummaryClient(model=model).summarise_async(transcript))
+    assert summary == 'async summary 1'
+
+
+def test_deadline_falls_back_to_rule_based_summary(transcript):
+    utterances = classify_utterances(transcript)
+    client = SummaryClient(model=FakeModel(latency=0.5), timeout=0.05)
+    summary = client.summarise(transcript, utterances)
+    assert summary == summarise.rule_based_summary(utterances)
+    assert client.timeouts == 1
+    # The upstream call carries on in the background and fills the cache for the next request
+    wait_for_background_calls(client)
+    assert client.summarise(transcript, utterances).startswith('Summary of')
+
+
+def test_identical_concurrent_requests_share_one_call(transcript):
+    model = AsyncFakeModel(latency=0.05)
+    client = SummaryClient(model=model)
+
+    async def run():
+        return await asyncio.gather(*(client.summarise_async(transcript) for _ in range(5)))
+
+    summaries = asyncio.run(run())
+    assert len(set(summaries)) == 1
+    assert model.calls == 1
+    assert client.coalesced == 4
+
+
+def test_concurrency_is_bounded(transcript):
+    model = AsyncFakeModel(latency=0.05)
+    client = SummaryClient(model=model, max_concurrency=2)
+    active = [0, 0]   # current, peak
+    generate = model.generate_content_async
+
+    async def counting(prompt, **kwargs):
+        active[0] += 1
+        active[1] = max(active)
+        try:
+            return await generate(prompt)
+        finally:
+            active[0] -= 1
+
+    model.generate_content_async = counting
+
+    async def run():
+        return await asyncio.gather(*(client.summarise_async(f"{transcript}\nAlice: Variant {i}.") for i in range(6)))
+
+    asyncio.run(run())
+    assert model.calls == 6
+    assert active[1] == 2
+
+
+def test_client_is_shared_across_event_loops(transcript):
+    model = AsyncFakeModel(latency=0.01)
+    client = SummaryClient(model=model, max_concurrency=2)
+
+    async def run(batch):
+        return await asyncio.gather(*(client.summarise_async(f"{transcript}\nAlice: Variant {batch}-{i}.")
+                                      for i in range(4)))
+
+    # Each asyncio.run() has its own loop; the contended semaphore must not tie the client to the first one
+    for batch in range(2):
+        summaries = asyncio.run(run(batch))
+        assert not any(summary.startswith('[') for summary in summaries)
+    assert model.calls == 8
+
+
+def test_failures_are_reported_and_not_cached(transcript):
+    failing = SummaryClient(model=FakeModel(latency=0, error_rate=1.0))
+    assert failing.summarise(transcript).startswith('[Gemini summarization failed')
+    model = FakeModel(latency=0)
+    assert not SummaryClient(model=model).summarise(transcript).startswith('[')
+    assert model.calls == 1
+
+
+def test_short_dialogue_skips_the_model():
+    model = FakeModel(latency=0)
+    transcript = build_transcript(summarise.SHORT_DIALOGUE_UTTERANCES)
+    utterances = classify_utterances(transcript)
+    assert SummaryClient(model=model).summarise(transcript, utterances) == summarise.rule_based_summary(utterances)
+    assert model.calls == 0
+
+
+def test_cache_is_read_and_written_off_the_event_loop_thread(transcript, tmp_path, monkeypatch):
+    threads = []
+
+    class RecordingCache(SummaryCache):
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return super().get(key)
+
+        def set(self, key, summary):
+            threads.append(threading.current_thread())
+            super().set(key, summary)
+
+    monkeypatch.setattr(summarise, 'summary_cache', RecordingCache(str(tmp_path / 'recording.sqlite3')))
+
+    async def run():
+        await SummaryClient(model=AsyncFakeModel(latency=0)).summarise_async(transcript)
+        return threading.current_thread()
+
+    caller_thread = asyncio.run(run())
+    assert len(threads) == 2
+    assert caller_thread not in threads
+    assert not any(thread.name == 'summary-client' for thread in threads)
+
+
+def test_fallback_uses_the_given_index(transcript):
+    from analytics import build_index
+
+    utterances = classify_utterances(transcript)
+    index = build_index(utterances)
+    lookups = []
+    has_pair = index.has_pair
+    index.has_pair = lambda *args: lookups.append(args) or has_pair(*args)
+    client = SummaryClient(model=FakeModel(latency=0.5), timeout=0.05)
+    summary = client.summarise(transcript, utterances, index=index)
+    assert summary == summarise.rule_based_summary(utterances)
+    assert lookups
+    wait_for_background_calls(client)
@@ -0,0 +1,122 @@
+"""
+Background sink for utterances that fall through to the default 'Statement' label.
+
+Records are queued from the classifier without touching the disk; a writer thread
+drains the queue in batches, collapses repeated utterances into one line with a
+count, and rotates the log file by size. read_utterances() parses the log back.
+"""
+import atexit
+import os
+import queue
+import re
+import threading
+from collections import Counter
+
+# "[DEFAULT Statement] text", or "[DEFAULT Statement xN] text" for N repeats in one batch
+_LINE_RE = re.compile(r'^\[DEFAULT Statement(?: x\d+)?\] ?')
+
+
+class UnclassifiedLog:
+    def __init__(self, path, enabled=True, max_bytes=5 * 1024 * 1024, backup_count=3,
+                 flush_interval=1.0, batch_size=1000, max_queue=100000):
+        self.path = path
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        atexit.register(self.flush)
+
+    def record(self, utterance):
+        """Queues an utterance for the log. Never blocks; drops records if the queue is full."""
+        if not self.enabled:
+            return
+        try:
+            self._ensure_writer().put_nowait(utterance)
+        except queue.Full:
+            self.dropped += 1
+
+    def read_utterances(self):
+        """Returns the logged utterances in file order, one per line (xN counts are not expanded)."""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as logf:
+            return [_LINE_RE.sub('', line, count=1).strip() for line in logf if line.strip()]
+
+    def flush(self, timeout=5.0):
+        """Blocks until everything queued so far has been written."""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _ensure_writer(self):
+        # Started lazily, and again after a fork, since worker processes inherit the
+        # queue object but not the writer thread.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(self.max_queue)
+                    self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                    name='unclassified-log', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _run(self, q):
+        while True:
+            try:
+                items = [q.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(items) < self.batch_size:
+                try:
+                    items.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = [item for item in items if isinstance(item, threading.Event)]
+            counts = Counter(item for item in items if not isinstance(item, threading.Event))
+            if counts:
+                try:
+                    self._write(counts)
+                except OSError:
+                    pass
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, counts):
+        lines = []
+        for utterance, count in counts.items():
+            if count == 1:
+                lines.append(f"[DEFAULT Statement] {utterance}\n")
+            else:
+                lines.append(f"[DEFAULT Statement x{count}] {utterance}\n")
+        data = ''.join(lines)
+        self._rotate_if_needed(len(data.encode('utf-8')))
+        with open(self.path, 'a', encoding='utf-8') as logf:
+            logf.write(data)
+
+    def _rotate_if_needed(self, incoming):
+        if not self.max_bytes:
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        if self.backup_count < 1:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
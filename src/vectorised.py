@@ -0,0 +1,98 @@
+"""
+Columnar classification engine for bulk analytics with pandas.
+
+Applies the same rule tables as classify.classify_function to whole Series at once:
+each category becomes one compiled alternation matched with str.contains, and the
+priority order is resolved with np.select. Repeated utterances are classified once,
+and each rule only scans the rows that no higher-priority rule has claimed.
+When pyarrow is installed, matching runs on Arrow strings in native code.
+
+Unlike classify_function, default-'Statement' rows are not written to the review log.
+
+Example:
+    df = transcript_to_frame(open('meeting.txt').read())
+    df = classify_frame(df)
+    df.groupby(['speaker', 'function']).size()
+"""
+import numpy as np
+import pandas as pd
+
+import metrics
+from classify import (
+    COMMITMENT_PHRASES, NEGATIVE_STARTS, QUESTION_PHRASES, REQUEST_PHRASES, RULES, _compile_phrases,
+)
+
+_REQUEST = _compile_phrases(REQUEST_PHRASES).pattern
+_QUESTION = _compile_phrases(QUESTION_PHRASES).pattern
+_NEGATIVE = _compile_phrases(NEGATIVE_STARTS).pattern
+_COMMITMENT = _compile_phrases(COMMITMENT_PHRASES).pattern
+_RULE_PATTERNS = [(function, _compile_phrases(phrases).pattern) for function, phrases in RULES]
+
+
+def _string_series(values):
+    try:
+        import pyarrow  # noqa: F401
+        return values.astype('string[pyarrow]')
+    except ImportError:
+        return values.astype(object)
+
+
+@metrics.timed('classify_vectorised')
+def classify_series(utterances):
+    """
+    Classifies a Series of raw utterances. Returns a Series of dialogue function
+    labels with the same index, matching classify_function row for row.
+    """
+    utterances = pd.Series(utterances)
+    codes, uniques = pd.factorize(utterances.fillna('').astype(str), sort=False)
+    utt = _string_series(pd.Series(uniques)).str.lower().str.strip()
+
+    undecided = np.ones(len(utt), dtype=bool)
+
+    def has(pattern, rows=None):
+        # Only rows not claimed by a higher-priority rule are scanned; the rest stay False.
+        rows = undecided if rows is None else rows
+        hit = np.zeros(len(utt), dtype=bool)
+        if rows.any():
+            hit[rows] = utt[rows].str.contains(pattern, regex=True).fillna(False).to_numpy(dtype=bool)
+        return hit
+
+    empty = (utt.str.len() == 0).fillna(True).to_numpy(dtype=bool)
+    question = utt.str.endswith('?').fillna(False).to_numpy(dtype=bool) & ~empty
+    request = has(_REQUEST, question)
+    conditions = [
+        empty,
+        request,
+        has(_QUESTION, question & ~request),
+        question,
+    ]
+    undecided &= ~(empty | question)
+    conditions.append(has(_COMMITMENT, undecided & ~has(_NEGATIVE)))
+    undecided &= ~conditions[-1]
+    choices = ['Statement', 'Request', 'Question', 'Query', 'Commitment']
+    for function, pattern in _RULE_PATTERNS:
+        conditions.append(has(pattern))
+        undecided &= ~conditions[-1]
+        choices.append(function)
+    labels = np.select(conditions, choices, default='Statement')[codes]
+    if metrics.enabled:
+        for function, count in zip(*np.unique(labels, return_counts=True)):
+            metrics.inc('utterances_total', int(count), function=str(function))
+    return pd.Series(labels, index=utterances.index, name='function')
+
+
+def classify_frame(df, column='utterance'):
+    """Returns a copy of df with a 'function' column computed from df[column]."""
+    out = df.copy()
+    out['function'] = classify_series(df[column])
+    return out
+
+
+def transcript_to_frame(transcript):
+    """Parses 'Speaker: utterance' lines into a DataFrame with speaker and utterance columns."""
+    lines = pd.Series(transcript.strip().split('\n'))
+    parts = lines.str.extract(r'^(.*?):\s+(.*)$').dropna()
+    parts.columns = ['speaker', 'utterance']
+    parts['speaker'] = parts['speaker'].str.strip()
+    parts['utterance'] = parts['utterance'].str.strip()
+    return parts.reset_index(drop=True)